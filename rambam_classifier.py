@@ -1,96 +1,276 @@
-#!/usr/bin/env python
-from utils import svm_classification as sc
-from utils import data_handler as dh
-from argparse import ArgumentParser
-import sys
-
-
-def main(parser):
-    # build the train and test sets and get their pathes.
-    train_set_path, test_set_path = dh.main(parser)
-
-    # build the pipe and run it on the test set.
-    if parser.pipe == "fit":
-        pipe = sc.fitPipe(train_set_path)
-    elif parser.pipe == "load":
-        pipe = sc.loadPipe()
-    else: # parser.pipe == "search":
-        pipe = sc.searchFitPipe(train_set_path, parser.classification, parser.show_results,
-                                parser.save_pipe)
-
-    # Run the pipe on the test and print the result.
-    sc.runTest(test_set_path, pipe, parser.print_report)
-
-    # Delete the train and test folders.
-    # dh.setFolderHandler(parser.set_path)
-
-
-if __name__ == "__main__":
-    parser = ArgumentParser(description="Rambam data handler")
-    parser.add_argument("--train_path",
-                        type=str,
-                        default="./data/train_data/",
-                        help="Set the path to the data that the classifier will use for training.")
-    parser.add_argument("--test_path",
-                        type=str,
-                        default="./data/test_data/",
-                        help="Set the path to the data that the classifier will be tested on.")
-    parser.add_argument("--set_path",
-                        type=str,
-                        default="./data_set/",
-                        help="Set the path that the program will use to storeage the data set. NOTE: will be deleted when finished.")
-    parser.add_argument("--no_shuffle",
-                        action="store_true",
-                        help="The train sets Will NOT be shuffled. NOTE:if divided train to train-test it's best to use shuffle.")
-    parser.add_argument("--train_ratio",
-                        type=float,
-                        choices=[x / 100 for x in range(50, 101)],
-                        default=1.,
-                        help="set the ratio for the train-test divider. NOTE: putting 1 will send all the files to the train set.")
-    parser.add_argument("--test_amount",
-                        type=int,
-                        default=20,
-                        help="set the amount for the test-train divider. NOTE: putting 0 will send all the files to the test set.")
-    parser.add_argument("--test_sorter",
-                        type=str,
-                        choices=["full", "amount", "rambam"],
-                        default="full",
-                        help="set the test-train divider.")
-    parser.add_argument("--only_rambam",
-                        action="store_true",
-                        help="will use only the rambam for the train set.")
-    parser.add_argument("--test_source",
-                        type=str,
-                        choices=["rambam", "ben", "kizur", "tur"],
-                        default="rambam",
-                        help="set the source for the test.")
-    parser.add_argument("--classification",
-                        type=str,
-                        choices=["LinearSVC", "SVC"],
-                        default="LinearSVC",
-                        help="The type of classification that will be use. The classification can be LinearSVC or SVC.")
-    parser.add_argument("--pipe",
-                        type=str,
-                        choices=["fit", "load", "search"],
-                        default="fit",
-                        help="Set the operation to set the pipe. fit - Fit a pipe with the recommenet value. load - Load a pickled pipe the pickle should be named 'pipe.pickle' and put in the main folder. search - Search for the best values for the train data.")
-    parser.add_argument("--show_results",
-                        action="store_true",
-                        help="Show all the result of the search for the best arguments for the pipe. NOTE: used with search option.")
-    parser.add_argument("--save_pipe",
-                        action="store_true",
-                        help="Save the fitted pipe. NOTE: used with search option.")
-    parser.add_argument("--print_report",
-                        action="store_true",
-                        help="Print the classification report.")
-
-    # Run the program itself with the parameters
-    parser = parser.parse_args()
-
-    # If the test set is the rambam the ratio need to divide it thus it cannot be 1
-    #   as 1 put all the data in the train set.
-    if (parser.test_source == "rambam") and (parser.train_ratio == 1.):
-        print("The usage of the rambam as a test set can't have train ratio of 1")
-        sys.exit(0)
-
-    main(parser)
+#!/usr/bin/env python
+from utils import svm_classification as sc
+from utils import data_handler as dh
+from utils import prediction as pr
+from utils import model_artifact as ma
+from utils import evaluation as ev
+from utils import experiment as ex
+from utils import instrumentation as it
+from argparse import ArgumentParser, Namespace
+from tempfile import mkdtemp
+import sys
+
+
+def main(parser):
+    # Predict the raw texts with the saved pipe, no sets are needed.
+    if parser.predict_path:
+        pr.predictTexts(parser.predict_path, parser.pipe_path, parser.predict_output, parser.top_k,
+                        parser.chunk_size, parser.processes)
+        return
+
+    # Run the experiment on the splits of the Rambam, the sets are built in memory.
+    if parser.splits or parser.folds:
+        ex.runExperiment(parser, parser.splits, parser.folds, parser.seed or 0,
+                         parser.experiment_output, parser.processes)
+        return
+
+    # Update the saved online pipe with the new or changed train sources, no sets are needed.
+    if parser.pipe == "update":
+        pipe = sc.loadPipe(parser.pipe_path)
+        train_set, source_hashes = dh.changedSources(parser, getattr(pipe, "source_hashes_", {}))
+        pipe = sc.updatePipe(pipe, train_set, parser.epochs, parser.batch_size)
+        pipe.source_hashes_ = source_hashes
+        sc.savePipe(pipe, parser.pipe_path)
+        return
+
+    # build the train and test sets and get their pathes (or the sets if in_memory).
+    #   When evaluating all the sources only the train and the Rambam test sets are built.
+    set_parser = Namespace(**{**vars(parser), "test_source": "rambam"}) if parser.evaluate_all else parser
+    train_set_path, test_set_path = dh.main(set_parser, parser.in_memory)
+
+    # build the pipe and run it on the test set.
+    if parser.pipe == "fit":
+        pipe = sc.fitPipe(train_set_path, parser.feature_store, parser.select_k,
+                           parser.hebrew_analyzer)
+    elif parser.pipe == "load":
+        with it.stage("load_pipe"):
+            pipe = sc.loadPipe(parser.pipe_path)
+    elif parser.pipe == "search" and parser.classification == "PrecomputedSVC":
+        pipe = sc.kernelSearchFitPipe(train_set_path, parser.show_results, parser.save_pipe,
+                                      parser.save_results, parser.select_k, parser.hebrew_analyzer,
+                                      parser.svc_cache_size)
+    elif parser.pipe == "search":
+        pipe = sc.searchFitPipe(train_set_path, parser.classification, parser.show_results,
+                                parser.save_pipe, parser.save_results, parser.select_k,
+                                parser.hebrew_analyzer, parser.svc_cache_size)
+    elif parser.pipe == "halving":
+        pipe = sc.halvingSearchFitPipe(train_set_path, parser.classification, parser.show_results,
+                                       parser.save_pipe, parser.save_results, parser.feature_store,
+                                       select_k=parser.select_k, hebrew_analyzer=parser.hebrew_analyzer,
+                                       cache_size=parser.svc_cache_size)
+    else: # parser.pipe == "online":
+        pipe = sc.onlineFitPipe(train_set_path, parser.epochs, parser.batch_size)
+        # Keep the hashes of the train sources for updating the pipe.
+        pipe.source_hashes_ = dh.sourceHashes(parser)
+        if parser.save_pipe:
+            sc.savePipe(pipe, parser.pipe_path)
+
+    # Print the size of the fitted pipe.
+    if parser.pipe != "load":
+        sc.printPipeSize(pipe)
+
+    # Export the pipe as a model artifact.
+    if parser.export_artifact:
+        ma.exportPipe(pipe, parser.export_artifact)
+
+    # Evaluate the pipe on all the test sources.
+    if parser.evaluate_all:
+        target_names = getattr(pipe, "target_names_", None) or sc.setEntries(train_set_path)[0]
+        ev.evaluateAll(pipe, target_names, test_set_path, parser, parser.evaluation_output,
+                       parser.processes)
+        return
+
+    # Run the pipe on the test and print the result.
+    accuracy = sc.runTest(test_set_path, pipe, parser.print_report, parser.feature_store)
+
+    # Compare the online pipe to the pipe with the recommenet value.
+    if parser.compare and parser.pipe == "online":
+        print("\nFitting the recommenet pipe for comparison.")
+        fit_accuracy = sc.runTest(test_set_path, sc.fitPipe(train_set_path, parser.feature_store),
+                                  feature_store=parser.feature_store)
+        print(f"\nOnline pipe accuracy: {accuracy:.2f}%, recommenet pipe accuracy: {fit_accuracy:.2f}%")
+
+    # Delete the train and test folders.
+    # dh.setFolderHandler(parser.set_path)
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Rambam data handler")
+    parser.add_argument("--train_path",
+                        type=str,
+                        default="./data/train_data/",
+                        help="Set the path to the data that the classifier will use for training.")
+    parser.add_argument("--test_path",
+                        type=str,
+                        default="./data/test_data/",
+                        help="Set the path to the data that the classifier will be tested on.")
+    parser.add_argument("--set_path",
+                        type=str,
+                        default="./data_set/",
+                        help="Set the path that the program will use to storeage the data set. NOTE: will be deleted when finished.")
+    parser.add_argument("--temp_set",
+                        action="store_true",
+                        help="Build the sets in a new temporary folder (deleted when finished) instead of the set path, so runs at the same time don't collide.")
+    parser.add_argument("--in_memory",
+                        action="store_true",
+                        help="Build the train and test sets in memory instead of writing them to the set path.")
+    parser.add_argument("--corpus_store",
+                        action="store_true",
+                        help="Build the train and test sets as arrays of segment numbers over a single memory mapped corpus file in the set path instead of a file for each segment.")
+    parser.add_argument("--processes",
+                        type=int,
+                        default=1,
+                        help="Set the number of processes used to extract the data files. NOTE: putting 0 will use all the cores.")
+    parser.add_argument("--cache_path",
+                        type=str,
+                        default="",
+                        help="Set the path that the program will use to cache the extracted segments of each data file (like './extraction_cache/'). NOTE: empty path (default) disable the cache, so nothing is written to the disk with in_memory.")
+    parser.add_argument("--no_shuffle",
+                        action="store_true",
+                        help="The train sets Will NOT be shuffled. NOTE:if divided train to train-test it's best to use shuffle.")
+    parser.add_argument("--train_ratio",
+                        type=float,
+                        choices=[x / 100 for x in range(50, 101)],
+                        default=1.,
+                        help="set the ratio for the train-test divider. NOTE: putting 1 will send all the files to the train set.")
+    parser.add_argument("--test_amount",
+                        type=int,
+                        default=20,
+                        help="set the amount for the test-train divider. NOTE: putting 0 will send all the files to the test set.")
+    parser.add_argument("--test_sorter",
+                        type=str,
+                        choices=["full", "amount", "rambam"],
+                        default="full",
+                        help="set the test-train divider.")
+    parser.add_argument("--only_rambam",
+                        action="store_true",
+                        help="will use only the rambam for the train set.")
+    parser.add_argument("--test_source",
+                        type=str,
+                        choices=["rambam", "ben", "kizur", "tur"],
+                        default="rambam",
+                        help="set the source for the test.")
+    parser.add_argument("--classification",
+                        type=str,
+                        choices=["LinearSVC", "SVC", "PrecomputedSVC"],
+                        default="LinearSVC",
+                        help="The type of classification that will be use. The classification can be LinearSVC or SVC. PrecomputedSVC search the SVC with the kernels computed once for each fold and vectorizer setting from their Gram matrix. NOTE: PrecomputedSVC is used with search option.")
+    parser.add_argument("--svc_cache_size",
+                        type=int,
+                        default=200,
+                        help="Set the kernel cache of the SVC in MB. NOTE: used with SVC and PrecomputedSVC.")
+    parser.add_argument("--pipe",
+                        type=str,
+                        choices=["fit", "load", "search", "halving", "online", "update"],
+                        default="fit",
+                        help="Set the operation to set the pipe. fit - Fit a pipe with the recommenet value. load - Load a saved pipe from the pipe path (by default 'pipe.pickle' in the main folder). search - Search for the best values for the train data. halving - Search for the best values with successive halving, bad values are dropped early on small parts of the train data. online - Fit a hashing pipe on minibatches of the train data, for train data that doesn't fit in memory. update - Update the saved online pipe (the pipe path) with only the new or changed train sources (divided by the train ratio like the train set) and the sample of the old segments the pipe keep, and save it again.")
+    parser.add_argument("--pipe_path",
+                        type=str,
+                        default="pipe.pickle",
+                        help="Set the path of the pipe to load and predict with (and of the saved online pipe). NOTE: can be a pickle or a model artifact folder.")
+    parser.add_argument("--export_artifact",
+                        type=str,
+                        default="",
+                        help="Set the folder to export the pipe to as a model artifact (a small, fast loading format for predicting). NOTE: empty path (default) disable the export.")
+    parser.add_argument("--show_results",
+                        action="store_true",
+                        help="Show all the result of the search for the best arguments for the pipe. NOTE: used with search and halving options.")
+    parser.add_argument("--save_pipe",
+                        action="store_true",
+                        help="Save the fitted pipe. NOTE: used with search, halving and online options.")
+    parser.add_argument("--save_results",
+                        action="store_true",
+                        help="Save all the results of the search as 'search_results.json'. NOTE: used with search and halving options.")
+    parser.add_argument("--select_k",
+                        type=int,
+                        default=0,
+                        help="Keep only this number of terms with the best chi2 score for the labels and prune the vocabulary of the pipe to them. With search and halving options it is checked against keeping all the terms. NOTE: 0 (default) keep all the terms.")
+    parser.add_argument("--hebrew_analyzer",
+                        action="store_true",
+                        help="Tokenize the text with the Hebrew tokenizer that join the forms of a word (prefixes, quote marks and final letters) into a single feature. NOTE: a prefix is stripped only when the word without it is more common in the train set.")
+    parser.add_argument("--epochs",
+                        type=int,
+                        default=5,
+                        help="Set the number of passes over the train data. NOTE: used with online and update options.")
+    parser.add_argument("--batch_size",
+                        type=int,
+                        default=1000,
+                        help="Set the number of segments in each minibatch. NOTE: used with online and update options.")
+    parser.add_argument("--compare",
+                        action="store_true",
+                        help="Also fit the pipe with the recommenet value and compare the test accuracy of both. NOTE: used with online option.")
+    parser.add_argument("--feature_store",
+                        type=str,
+                        default="",
+                        help="Set the path of the feature store that save the fitted vectorizer and the sets matrices for the next runs. NOTE: empty path (default) disable the feature store.")
+    parser.add_argument("--trace",
+                        type=str,
+                        default="",
+                        help="Set the JSON lines file to write the time, memory and counts of each stage of the run to. NOTE: empty path (default) disable the trace.")
+    parser.add_argument("--print_report",
+                        action="store_true",
+                        help="Print the classification report.")
+    parser.add_argument("--evaluate_all",
+                        action="store_true",
+                        help="Evaluate the pipe on all the test sources (each with all its data) and the Rambam test set (if the train ratio is below 1) in parallel instead of the test source. NOTE: the processes are used for the evaluation.")
+    parser.add_argument("--evaluation_output",
+                        type=str,
+                        default="evaluation",
+                        help="Set the path (without suffix) of the JSON and CSV files the evaluation is written to. NOTE: used with evaluate all.")
+    parser.add_argument("--splits",
+                        type=int,
+                        default=0,
+                        help="Run an experiment of this number of seeded train-test splits of the Rambam (by the train ratio) in parallel instead of a single run and print the mean and std accuracy of each label. NOTE: the processes are used for the splits.")
+    parser.add_argument("--folds",
+                        type=int,
+                        default=0,
+                        help="Run an experiment of this number of stratified folds of the Rambam in parallel instead of a single run (like splits). NOTE: the processes are used for the folds.")
+    parser.add_argument("--seed",
+                        type=int,
+                        default=None,
+                        help="Set the seed of the shuffle of the sets so the run can be repeated. NOTE: the experiments use 0 by default.")
+    parser.add_argument("--experiment_output",
+                        type=str,
+                        default="experiment",
+                        help="Set the path (without suffix) of the JSON file the experiment is written to. NOTE: used with splits and folds.")
+    parser.add_argument("--predict_path",
+                        type=str,
+                        default="",
+                        help="Set the path to a folder of text files or a JSONL file (with a 'text' on each line) to predict with the saved pipe instead of training and testing. NOTE: the processes are used for the prediction.")
+    parser.add_argument("--predict_output",
+                        type=str,
+                        default="predictions.jsonl",
+                        help="Set the JSONL file the predictions are written to. NOTE: used with predict path.")
+    parser.add_argument("--top_k",
+                        type=int,
+                        default=3,
+                        help="Set the number of best labels (with their scores) written for each text. NOTE: used with predict path.")
+    parser.add_argument("--chunk_size",
+                        type=int,
+                        default=256,
+                        help="Set the number of texts predicted together. NOTE: used with predict path.")
+
+    # Run the program itself with the parameters
+    parser = parser.parse_args()
+
+    # If the test set is the rambam the ratio need to divide it thus it cannot be 1
+    #   as 1 put all the data in the train set (no sets are built for predicting, updating or folds).
+    if ((not parser.predict_path) and (parser.pipe != "update") and (not parser.evaluate_all) and
+            (not parser.folds) and (parser.test_source == "rambam") and (parser.train_ratio == 1.)):
+        print("The usage of the rambam as a test set can't have train ratio of 1")
+        sys.exit(0)
+
+    if parser.trace:
+        it.enableTrace(parser.trace)
+    # Build the sets in a new temporary folder that is deleted when finished. The folder is
+    #   only made when the sets are written to the disk (in folders or a corpus store).
+    temp_set = parser.temp_set and not (parser.in_memory or parser.predict_path or parser.splits or
+                                        parser.folds or parser.pipe == "update")
+    if temp_set:
+        parser.set_path = mkdtemp(prefix="data_set_")
+    try:
+        with it.stage("main"):
+            main(parser)
+    finally:
+        if temp_set:
+            dh.setFolderHandler(parser.set_path)
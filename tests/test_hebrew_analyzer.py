@@ -0,0 +1,35 @@
+from utils.hebrew_analyzer import HebrewTokenizer, normalizeToken
+import pytest
+
+TEXTS = ["שבת שבת בשבת ולשבת בת", "שמירה מלכות כתובה הלכות הלכות שבהלכות",
+         "לולב מלאכה ברכות כלאים", "לא ולא לא"]
+
+
+def test_normalize_token():
+    assert normalizeToken('רמב"ם') == "רמבמ"
+    assert normalizeToken("ג׳") == "ג'"
+
+
+# The words that start with a prefix letter of the word itself are kept, since the word
+#   without it isn't more common in the texts.
+@pytest.mark.parametrize("word, stem", [
+    ("שמירה", "שמירה"), ("מלכות", "מלכות"), ("כתובה", "כתובה"), ("לולב", "לולב"),
+    ("הלכות", "הלכות"), ("מלאכה", "מלאכה"), ("ברכות", "ברכות"), ("כלאים", "כלאימ"),
+    ("שבת", "שבת"),
+])
+def test_words_are_kept(word, stem):
+    assert HebrewTokenizer().fit(TEXTS)(word) == [stem]
+
+
+# The prefixes are stripped when the word without them is more common in the texts, also
+#   from words that aren't in the texts.
+@pytest.mark.parametrize("word, stem", [
+    ("בשבת", "שבת"), ("ולשבת", "שבת"), ("כשבת", "שבת"), ("שבהלכות", "הלכות"), ("ולא", "לא"),
+])
+def test_prefixes_are_stripped(word, stem):
+    assert HebrewTokenizer().fit(TEXTS)(word) == [stem]
+
+
+# A tokenizer that isn't fitted only normalize the spelling.
+def test_not_fitted():
+    assert HebrewTokenizer()('הלכות שבת לפי הרמב"ם, פרק ג\'') == ["הלכות", "שבת", "לפי", "הרמבמ", "פרק", "ג'"]
@@ -0,0 +1,38 @@
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.pipeline import Pipeline
+from sklearn.svm import LinearSVC
+from utils import model_artifact as ma
+from utils import hebrew_analyzer as ha
+import numpy as np
+import pytest
+
+TEXTS = ["שבת מלאכה הדלקה נר", "שבת מלאכה בישול", "לולב סוכה אתרוג", "סוכה לולב ערבה",
+         "תפילה שמע ברכות", "ברכות תפילה מנחה"] * 3
+TARGET = np.array([0, 0, 1, 1, 2, 2] * 3)
+
+
+# The loaded artifact predict the same as the exported pipe.
+@pytest.mark.parametrize("use_idf", [True, False])
+def test_export_and_load(tmp_path, use_idf):
+    pipe = Pipeline([
+        ('vect', TfidfVectorizer(use_idf=use_idf)),
+        ('clf', LinearSVC()),
+    ]).fit(TEXTS, TARGET)
+    assert ma.exportPipe(pipe, str(tmp_path))
+
+    loaded = ma.loadArtifact(str(tmp_path))
+    assert np.allclose(loaded.decision_function(TEXTS), pipe.decision_function(TEXTS), atol=1e-5)
+    assert np.array_equal(loaded.predict(TEXTS), TARGET)
+
+
+# The artifact keep the word counts of the Hebrew tokenizer.
+def test_export_and_load_tokenizer(tmp_path):
+    pipe = Pipeline([
+        ('vect', TfidfVectorizer(tokenizer=ha.HebrewTokenizer().fit(TEXTS), token_pattern=None)),
+        ('clf', LinearSVC()),
+    ]).fit(TEXTS, TARGET)
+    assert ma.exportPipe(pipe, str(tmp_path))
+
+    loaded = ma.loadArtifact(str(tmp_path))
+    assert loaded.named_steps['vect'].tokenizer.counts == pipe.named_steps['vect'].tokenizer.counts
+    assert np.allclose(loaded.decision_function(TEXTS), pipe.decision_function(TEXTS), atol=1e-5)
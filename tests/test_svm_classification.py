@@ -0,0 +1,24 @@
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.pipeline import Pipeline
+from sklearn.svm import LinearSVC
+from utils import svm_classification as sc
+import numpy as np
+import pytest
+
+TEXTS = ["שבת מלאכה הדלקה נר", "שבת מלאכה בישול", "לולב סוכה אתרוג", "סוכה לולב ערבה",
+         "תפילה שמע ברכות", "ברכות תפילה מנחה"] * 3
+TARGET = np.array([0, 0, 1, 1, 2, 2] * 3)
+
+
+# The pruned pipe predict the same as the pipe with the feature selection.
+@pytest.mark.parametrize("use_idf", [True, False])
+def test_prune_pipe(use_idf):
+    pipe = sc.selectPipe(Pipeline([
+        ('vect', TfidfVectorizer(use_idf=use_idf)),
+        ('clf', LinearSVC()),
+    ]), 6).fit(TEXTS, TARGET)
+    pruned = sc.prunePipe(pipe)
+
+    assert len(pruned.named_steps['vect'].vocabulary_) == 6
+    assert np.allclose(pruned.decision_function(TEXTS), pipe.decision_function(TEXTS))
+    assert np.array_equal(pruned.predict(TEXTS), TARGET)
@@ -0,0 +1,384 @@
+#!/usr/bin/env python
+from argparse import ArgumentParser
+from . import dataset_extractor as de
+from . import linear_predictor as lp
+from . import svm_classification as sc
+from . import data_handler as dh
+from tempfile import mkdtemp
+from shutil import rmtree
+import multiprocessing
+import subprocess
+import platform
+import sklearn
+import numpy as np
+import pickle
+import json
+import glob
+import time
+import sys
+import os
+import re
+
+try:
+    import resource
+except ImportError: # Not available on Windows, the peak RSS isn't reported.
+    resource = None
+
+# The extractors benchmarked by the suite: the name of the extractor and the path of its
+#   source in the data folder.
+SUITE_EXTRACTORS = (
+    ("rambam", "train_data/" + dh.RAMBAM_PATH),
+    ("chinuch", "train_data/" + dh.CHINUCH_PATH),
+    ("noda_biyhudah", "train_data/" + dh.NODA_BIYHUDAH_PATH),
+    ("ben_ish_hai", "test_data/" + dh.BEN_ISH_HAI_PATH),
+    ("kizur_shulchan_aruch", "test_data/" + dh.KIZUR_SHULCHAN_ARUCH_PATH),
+    ("tur", "test_data/" + dh.TUR_PATH),
+)
+
+# The stages of the suite by their order.
+SUITE_STAGES = ("extract", "build_set", "load_files", "fit_pipe", "run_test", "reduce_set_file",
+                "search_fit_pipe")
+
+
+# The line cleaning the Rambam extractor used before the normalizer. Kept to compare
+#   the throughput of the normalizer against it.
+def legacyRambamClean(line):
+    line = re.sub(r'\s\([^()]*\)', '', line)
+    line = re.sub(r'\[[^()]*\]\s', '', line)
+
+    line = re.sub('[,.;:)("]', '', line)
+    line = line.replace("--", ' ')
+    line = line.replace('-', ' ')
+    return line.replace("  ", ' ')
+
+
+# The line cleaning the rest of the extractors used before the normalizer. Kept to
+#   compare the throughput of the normalizer against it.
+def legacyClean(line):
+    line = re.sub('[,.;:)(]', '', line)
+    # Remove utf-8 bom
+    bom = line[:1].encode("utf-8")
+    if bom == b'\xef\xbb\xbf':
+        line = line[1:]
+
+    return line
+
+
+# The function time the cleaning function on the lines repeat times and return the best
+#   throughput in MB/s.
+def throughput(clean, lines, size, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for line in lines:
+            clean(line)
+        best = min(best, time.perf_counter() - start)
+
+    return size / best / 2 ** 20
+
+
+# Micro-benchmark of the text normalizers against the legacy line cleaning. The function
+#   read all the text files in the path and print the per-MB throughput of each cleaner
+#   on the lines, and of the normalizer on the whole files.
+def normalizerBenchmark(path, repeat=5):
+    files = [open(file, 'r', encoding="utf8").read()
+             for file in glob.glob(path + "/**/*.txt", recursive=True)]
+    lines = [line.strip() for file in files for line in file.splitlines() if line.strip()]
+    size = sum(len(file.encode("utf-8")) for file in files)
+    print(f"Normalizer benchmark on {len(files)} files ({size / 2 ** 20:.2f} MB, {len(lines)} lines).")
+
+    cleaners = [
+        ("legacy rambam (lines)", legacyRambamClean, lines),
+        ("rambam normalizer (lines)", de.RAMBAM_NORMALIZER, lines),
+        ("rambam normalizer (files)", de.RAMBAM_NORMALIZER, files),
+        ("legacy (lines)", legacyClean, lines),
+        ("normalizer (lines)", de.NORMALIZER, lines),
+        ("normalizer (files)", de.NORMALIZER, files),
+    ]
+    for name, clean, texts in cleaners:
+        print(f"    {name:<28} {throughput(clean, texts, size, repeat):8.2f} MB/s")
+
+
+# The function time the predict function on the texts in batches of batch_size texts
+#   repeat times and return the best time in seconds.
+def predictTime(predict, texts, batch_size, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for i in range(0, len(texts), batch_size):
+            predict(texts[i:i + batch_size])
+        best = min(best, time.perf_counter() - start)
+
+    return best
+
+
+# Benchmark of the 'LinearPredictor' against the predict of the pipe. The function split
+#   all the text files in the path to segments like the extractors and print the latency of
+#   predicting a single segment and the throughput of predicting batches of segments (in
+#   segments and in the text files they came from per second).
+def predictorBenchmark(pipe_path, path, repeat=5, single=500):
+    files = sorted(glob.glob(path + "/**/*.txt", recursive=True))
+    words = [word for file in files
+             for word in de.NORMALIZER(open(file, 'r', encoding="utf8").read()).split()]
+    texts = [' '.join(words[i:i + de.WORDS_PER_SEGMENT])
+             for i in range(0, len(words), de.WORDS_PER_SEGMENT)]
+
+    pipe = sc.loadPipe(pipe_path)
+    if not lp.isLinearPipe(pipe):
+        print("The linear predictor benchmark need a pipe of a vectorizer and a linear classifier.")
+        return
+
+    predictor = lp.LinearPredictor(pipe)
+    same = np.mean(pipe.predict(texts) == predictor.predict(texts))
+    print(f"Predictor benchmark on {len(texts)} segments ({100 * same:.2f}% same predictions).")
+
+    for name, predict in (("pipe", pipe.predict), ("linear predictor", predictor.predict)):
+        latency = predictTime(predict, texts[:single], 1, repeat) / len(texts[:single])
+        seconds = predictTime(predict, texts, 1000, repeat)
+        print(f"    {name:<28} {1e6 * latency:8.1f} us/segment (single), {len(texts) / seconds:8.0f} "
+              f"segments/s and {len(files) / seconds:8.1f} docs/s (batch)")
+
+
+# The function return the size in MB of the file or all the files in the folder.
+def sizeOf(path):
+    files = glob.glob(path + "/**/*", recursive=True) if os.path.isdir(path) else [path]
+    return sum(os.path.getsize(file) for file in files if os.path.isfile(file)) / 2 ** 20
+
+
+# The function return the number of segments of a set folder.
+def setSegments(path):
+    return sum(len(os.listdir(os.path.join(path, label))) for label in os.listdir(path))
+
+
+# The function return the number of text files of the file or the folder.
+def textFiles(path):
+    return len(glob.glob(path + "/**/*.txt", recursive=True)) if os.path.isdir(path) else 1
+
+
+# The suite stages. Each stage return its measures: the number of segments, the number of
+#   documents (the text files it read, a set has a file for each segment), the MB of text
+#   it handled and the seconds of the measured part (when only part of the stage is timed).
+def extractStage(name, path):
+    data_set = getattr(de, f"{name}_extractor")(path, cache_path=None)
+    return {"segments": sum(len(segments) for segments in data_set.values()),
+            "docs": textFiles(path), "mb": sizeOf(path)}
+
+
+def buildSetStage(data_path, set_path):
+    path = f"{data_path}/train_data/{dh.RAMBAM_PATH}"
+    data_set = de.rambam_extractor(path, cache_path=None)
+    train_set_path, test_set_path = dh.setFolderHandler(set_path, True)
+
+    start = time.perf_counter()
+    dh.buildSet(data_set, dh.ratioBasedSorter(0.8), train_set_path, test_set_path)
+    dh.fillTestLabels(train_set_path, test_set_path)
+    return {"seconds": time.perf_counter() - start,
+            "segments": sum(len(segments) for segments in data_set.values()),
+            "docs": textFiles(path), "mb": sizeOf(set_path)}
+
+
+def loadFilesStage(set_path):
+    train_set = sc.load_set(f"{set_path}/train_set/", "Train")
+    return {"segments": len(train_set.data), "docs": len(train_set.data),
+            "mb": sizeOf(f"{set_path}/train_set/")}
+
+
+def fitPipeStage(set_path, pipe_path):
+    start = time.perf_counter()
+    pipe = sc.fitPipe(f"{set_path}/train_set/")
+    seconds = time.perf_counter() - start
+
+    with open(pipe_path, "wb") as file:
+        pickle.dump(pipe, file)
+    segments = setSegments(f"{set_path}/train_set/")
+    return {"seconds": seconds, "segments": segments, "docs": segments,
+            "mb": sizeOf(f"{set_path}/train_set/")}
+
+
+def runTestStage(set_path, pipe_path):
+    pipe = sc.loadPipe(pipe_path)
+    start = time.perf_counter()
+    sc.runTest(f"{set_path}/test_set/", pipe)
+    seconds = time.perf_counter() - start
+    segments = setSegments(f"{set_path}/test_set/")
+    return {"seconds": seconds, "segments": segments, "docs": segments,
+            "mb": sizeOf(f"{set_path}/test_set/")}
+
+
+def reduceSetFileStage(set_path):
+    segments = setSegments(f"{set_path}/train_set/")
+    dh.reduceSetFile(f"{set_path}/train_set/", dh.REDUCED_TO_AMOUNT)
+    return {"segments": segments, "docs": segments}
+
+
+def searchFitPipeStage(set_path):
+    sc.searchFitPipe(f"{set_path}/train_set/")
+    segments = setSegments(f"{set_path}/train_set/")
+    return {"segments": segments, "docs": segments, "mb": sizeOf(f"{set_path}/train_set/")}
+
+
+# The function run a stage function in a new process (so its peak RSS is its own) and send
+#   its measures with the wall time and the peak RSS in MB through the connection.
+def stageProcess(connection, stage, args):
+    start = time.perf_counter()
+    try:
+        measures = stage(*args)
+        measures.setdefault("seconds", time.perf_counter() - start)
+        if resource is not None:
+            peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            measures["peak_rss_mb"] = peak_rss / (2 ** 20 if sys.platform == "darwin" else 2 ** 10)
+    except Exception as e:
+        measures = {"error": repr(e)}
+    connection.send(measures)
+
+
+def runStage(stage, args):
+    context = multiprocessing.get_context("spawn")
+    receiver, sender = context.Pipe(False)
+    process = context.Process(target=stageProcess, args=(sender, stage, args))
+    process.start()
+    measures = receiver.recv()
+    process.join()
+    return measures
+
+
+# The function write a copy of the data folder to path where each text file is repeated
+#   scale times.
+def syntheticData(data_path, scale, path):
+    for file in glob.glob(data_path + "/**/*.txt", recursive=True):
+        copy = os.path.join(path, os.path.relpath(file, data_path))
+        os.makedirs(os.path.dirname(copy), exist_ok=True)
+        with open(file, 'r', encoding="utf8") as source:
+            text = source.read()
+        with open(copy, 'w', encoding="utf8") as target:
+            target.write("\n".join([text] * scale))
+
+
+# The function return the short hash of the current commit (or "unknown").
+def codeVersion():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+# The benchmark suite. The function run the stages (see 'SUITE_STAGES') on the data folder
+#   and on synthetic copies of it scaled by each of the scales, print the wall time, the
+#   peak RSS and the throughput of each stage and append them to the output JSONL file.
+#   The results of the last run in the file with the same stage and scale are printed
+#   along, so regressions between versions are visible.
+def suiteBenchmark(data_path, output, scales=(1,), stages=SUITE_STAGES):
+    run = {"run": time.strftime("%Y-%m-%dT%H:%M:%S"), "version": codeVersion(),
+           "python": platform.python_version(), "sklearn": sklearn.__version__}
+
+    # The last result of each stage and scale in the output file.
+    previous = {}
+    if os.path.isfile(output):
+        with open(output, 'r', encoding="utf8") as file:
+            for line in file:
+                result = json.loads(line)
+                previous[(result["stage"], result["scale"])] = result
+
+    work_path = mkdtemp(prefix="benchmark_")
+    results = []
+    try:
+        for scale in scales:
+            path = data_path
+            if scale != 1:
+                path = os.path.join(work_path, f"data_x{scale}")
+                syntheticData(data_path, scale, path)
+            set_path = os.path.join(work_path, "data_set")
+            pipe_path = os.path.join(work_path, "pipe.pickle")
+
+            jobs = []
+            if "extract" in stages:
+                jobs += [(f"extract_{name}", extractStage, (name, os.path.join(path, source)))
+                         for name, source in SUITE_EXTRACTORS
+                         if os.path.exists(os.path.join(path, source))]
+            jobs += [job for job in (
+                ("build_set", buildSetStage, (path, set_path)),
+                ("load_files", loadFilesStage, (set_path,)),
+                ("fit_pipe", fitPipeStage, (set_path, pipe_path)),
+                ("run_test", runTestStage, (set_path, pipe_path)),
+                ("reduce_set_file", reduceSetFileStage, (set_path,)),
+                ("search_fit_pipe", searchFitPipeStage, (set_path,)),
+            ) if job[0] in stages]
+
+            print(f"\nBenchmark suite on {path} (scale {scale}).")
+            for name, stage, args in jobs:
+                measures = runStage(stage, args)
+                result = dict(run, stage=name, scale=scale, **measures)
+                if "error" not in measures:
+                    if "mb" in measures:
+                        result["mb_per_s"] = measures["mb"] / measures["seconds"]
+                    result["segments_per_s"] = measures["segments"] / measures["seconds"]
+                    result["docs_per_s"] = measures["docs"] / measures["seconds"]
+                results.append(result)
+                printResult(result, previous.get((name, scale)))
+    finally:
+        rmtree(work_path, ignore_errors=True)
+
+    with open(output, 'a', encoding="utf8") as file:
+        for result in results:
+            file.write(json.dumps(result) + "\n")
+    print(f"\nThe results were added to '{output}'.")
+
+
+# The function print the result of a stage and the change of its time from the previous result.
+def printResult(result, previous=None):
+    if "error" in result:
+        print(f"    {result['stage']:<30} failed: {result['error']}")
+        return
+
+    line = f"    {result['stage']:<30} {result['seconds']:9.2f} s"
+    line += f" {result['peak_rss_mb']:9.1f} MB RSS" if "peak_rss_mb" in result else " " * 16
+    line += f" {result['mb_per_s']:9.2f} MB/s" if "mb_per_s" in result else " " * 15
+    line += f" {result['segments_per_s']:10.0f} segments/s"
+    line += f" {result['docs_per_s']:10.1f} docs/s" if "docs_per_s" in result else " " * 18
+    if previous is not None and "seconds" in previous:
+        line += f" ({result['seconds'] / previous['seconds']:.2f}x the time of {previous['version']})"
+    print(line)
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description="Rambam classifier benchmarks")
+    parser.add_argument("--data_path",
+                        type=str,
+                        default="./data/",
+                        help="Set the path to the data that the benchmarks will run on.")
+    parser.add_argument("--repeat",
+                        type=int,
+                        default=5,
+                        help="Set the number of times each benchmark is repeated (the best time is used).")
+    parser.add_argument("--pipe_path",
+                        type=str,
+                        default="pipe.pickle",
+                        help="Set the path to the pipe (pickle or model artifact folder) of the predictor benchmark. NOTE: the benchmark is skipped when the pipe is missing.")
+    parser.add_argument("--suite",
+                        action="store_true",
+                        help="Run the benchmark suite of the program stages instead of the normalizer and predictor benchmarks. NOTE: the data path should be the main data folder.")
+    parser.add_argument("--stages",
+                        nargs="+",
+                        choices=SUITE_STAGES,
+                        default=SUITE_STAGES,
+                        help="Set the stages of the benchmark suite.")
+    parser.add_argument("--scales",
+                        nargs="+",
+                        type=int,
+                        default=[1, 2],
+                        help="Set the scales of the synthetic copies of the data the benchmark suite run on (1 is the data itself).")
+    parser.add_argument("--output",
+                        type=str,
+                        default="benchmark_results.jsonl",
+                        help="Set the JSONL file the results of the benchmark suite are added to.")
+
+    # Run the benchmarks with the parameters
+    parser = parser.parse_args()
+    if parser.suite:
+        suiteBenchmark(parser.data_path, parser.output, parser.scales, parser.stages)
+        sys.exit(0)
+
+    normalizerBenchmark(parser.data_path, parser.repeat)
+    if os.path.exists(parser.pipe_path):
+        predictorBenchmark(parser.pipe_path, parser.data_path, parser.repeat)
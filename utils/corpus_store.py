@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+from collections.abc import Sequence
+from random import shuffle
+import numpy as np
+import json
+import os
+
+# The corpus store is a folder that hold all the segments of the sets in a single packed
+#   corpus instead of a file for each segment:
+#   'segments.bin' - the UTF-8 bytes of all the segments one after the other.
+#   'offsets.npy' - the start of each segment in the bytes (and the end of the last).
+#   'labels.npy' - the label number of each segment (in 'labels.json').
+#   'labels.json' - the labels of the store.
+#   The files are memory mapped, so a set is only an array of segment numbers (see
+#   'SegmentView') and sorting or reducing it is slicing the array without copying text.
+
+
+# The class write the segments to a new corpus store in the folder. The segments are added
+#   by 'add' or 'append' (that return their numbers) and the store is opened by 'close'.
+#   The segments that were written can already be read (see 'text').
+class StoreWriter:
+    def __init__(self, path):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.file = open(os.path.join(path, "segments.bin"), "w+b")
+        self.offsets = [0]
+        self.labels = []
+        self.label_numbers = {}
+
+    # The function add a segment of the label and return its number.
+    def append(self, label, segment):
+        data = segment.encode("utf8")
+        self.file.write(data)
+        self.offsets.append(self.offsets[-1] + len(data))
+        self.labels.append(self.label_numbers.setdefault(label, len(self.label_numbers)))
+        return len(self.labels) - 1
+
+    # The function add the segments of the label and return the array of their numbers.
+    def add(self, label, segments):
+        start = len(self.labels)
+        for segment in segments:
+            self.append(label, segment)
+
+        return np.arange(start, len(self.labels))
+
+    # The function return the text of a written segment.
+    def text(self, i):
+        self.file.seek(self.offsets[i])
+        data = self.file.read(self.offsets[i + 1] - self.offsets[i])
+        self.file.seek(0, os.SEEK_END)
+        return data.decode("utf8")
+
+    # The function write the arrays of the store and return the opened store.
+    def close(self):
+        self.file.close()
+        np.save(os.path.join(self.path, "offsets.npy"), np.array(self.offsets, dtype=np.int64))
+        np.save(os.path.join(self.path, "labels.npy"), np.array(self.labels, dtype=np.int32))
+        with open(os.path.join(self.path, "labels.json"), 'w', encoding="utf8") as file:
+            json.dump(sorted(self.label_numbers, key=self.label_numbers.get), file, ensure_ascii=False)
+
+        return CorpusStore(self.path)
+
+
+# The class of an opened corpus store in the folder.
+class CorpusStore:
+    def __init__(self, path):
+        self.path = path
+        size = os.path.getsize(os.path.join(path, "segments.bin"))
+        # An empty file can't be memory mapped.
+        self.segments = (np.memmap(os.path.join(path, "segments.bin"), dtype=np.uint8, mode='r')
+                         if size else np.zeros(0, dtype=np.uint8))
+        self.offsets = np.load(os.path.join(path, "offsets.npy"), mmap_mode='r')
+        self.labels = np.load(os.path.join(path, "labels.npy"), mmap_mode='r')
+        with open(os.path.join(path, "labels.json"), 'r', encoding="utf8") as file:
+            self.label_names = json.load(file)
+
+    # The store is sent to other processes by its path and opened again there.
+    def __reduce__(self):
+        return CorpusStore, (self.path,)
+
+    def __len__(self):
+        return len(self.labels)
+
+    # The function return the text of the segment.
+    def text(self, i):
+        return self.segments[self.offsets[i]:self.offsets[i + 1]].tobytes().decode("utf8")
+
+    # The function return a view of the set in the form of dict where the keys are the label
+    #   and the values are arrays of segment numbers (or lists of such arrays).
+    def view(self, data_set):
+        target_names = sorted(data_set)
+        parts = [np.zeros(0, dtype=np.int64)]
+        for label in target_names:
+            parts.extend(data_set[label] if isinstance(data_set[label], list) else [data_set[label]])
+        indices = np.concatenate(parts).astype(np.int64)
+        return SegmentView(self, indices, target_names)
+
+
+# The class is a sequence of the texts of some segments of the store (by the array of their
+#   numbers, the store can also be a 'StoreWriter') and the labels of the set (target_names).
+#   Slicing the view or indexing it by an array give a view of these segments, so the
+#   sorters of the data handler work on views like they work on lists without copying text.
+class SegmentView(Sequence):
+    def __init__(self, store, indices, target_names=None):
+        self.store = store
+        self.indices = indices
+        self.target_names = target_names
+
+    def __len__(self):
+        return len(self.indices)
+
+    def __getitem__(self, key):
+        if isinstance(key, (slice, np.ndarray, list)):
+            return SegmentView(self.store, self.indices[key], self.target_names)
+
+        return self.store.text(self.indices[key])
+
+    def __iter__(self):
+        return map(self.store.text, self.indices)
+
+    # The function return the view in a random order (like 'random.shuffle').
+    def shuffled(self):
+        indices = np.array(self.indices)
+        shuffle(indices)
+        return SegmentView(self.store, indices, self.target_names)
+
+    # The function return the label numbers of the segments by their place in target_names.
+    def target(self):
+        order = np.array([self.target_names.index(label) if label in self.target_names else -1
+                          for label in self.store.label_names], dtype=np.int64)
+        return order[self.store.labels[self.indices]] if len(self.indices) else np.zeros(0, dtype=np.int64)
@@ -1,279 +1,540 @@
-#!/usr/bin/env python
-from argparse import ArgumentParser
-from collections import defaultdict
-from . import dataset_extractor as de
-from random import shuffle
-import glob
-import sys
-import os
-
-RAMBAM_PATH = "Rambam/"
-CHINUCH_PATH = "Chinuch/Chinuch.txt"
-NODA_BIYHUDAH_PATH = "Noda_Biyhudah/Noda Biyhudah.txt"
-BEN_ISH_HAI_PATH = "Ben-Ish Hai/"
-KIZUR_SHULCHAN_ARUCH_PATH = "Kizur Shulchan Aruch/"
-TUR_PATH = "Tur/"
-REDUCED_TO_AMOUNT = 40
-
-# The function take a path that the train and test sets will be put in and clean it.
-#   if the initialize is True the function also ready the folder for building the sets.
-def setFolderHandler(path, initialize=False):
-    # Clean the folders in the path.
-    try:
-        if os.path.isdir(path):
-            for set_folder in glob.glob(path + "/*"): # train_set folder and test_test folder.
-                for label in glob.glob(set_folder + "/*"): # all the labels in each set folder.
-                    for file in glob.glob(label + "/*"):
-                        os.remove(file)
-                    os.rmdir(label)
-                os.rmdir(set_folder)
-            os.rmdir(path)
-
-    except Exception as e:
-        print(f"The program can't delete the folder at {path}. Please delete it manually before rerunning the program.")
-        sys.exit(0)
-
-    # set the path and make the train and test sets folders.
-    if initialize:
-        train_set_path = path + "/train_set/"
-        test_set_path = path + "/test_set/"
-
-        os.mkdir(path)
-        os.mkdir(train_set_path)
-        os.mkdir(test_set_path)
-
-        return train_set_path, test_set_path
-
-
-# The function take all the labels at the train sets and make sure they exist in the
-#   test set folder since the pipe need to get all the labels he was trained on. (Helps
-#   if the test set don't contain all the labels)
-def fillTestLabels(train_set_path, test_set_path):
-    # Get the labels from the train set.
-    for label in os.listdir(train_set_path):
-        # Check the label exist in the test set otherwise it make a empty folder for the label.
-        path = test_set_path + label
-        if not os.path.isdir(path):
-            os.mkdir(path)
-
-
-# the function take a data set in the form of defaultdict(list) where the keys are the label,
-#   a sorter (to sort the data to main and secondary set), and at least one set path to write
-#   the data in. if the sorter divide the data into two sets a secondary path should be given.
-#   The function then take sort and write the data set and essentially 'build' the sets.
-#   NOTE: the function shuffle the data before dividing it unless no_shuffle set True.
-def buildSet(data_set, data_sorter, main_path, secondary_path=None, no_shuffle=False):
-    # The sub-function take path and data and write the data into files.
-    #   The sub-function write the files as a continuation of the files already in the
-    #   path as '#i.txt' where the 'i' is the following number starting with 0.
-    def writeToPath(path, data):
-        # Make the folder if it didn't exist.
-        if not os.path.isdir(path):
-            os.mkdir(path)
-
-        # Get the current nuber of file to write.
-        i = len(os.listdir(path))
-
-        # Write the data to the path.
-        for segment in data:
-            file = open(f"{path}#{i}.txt", "w", encoding="utf8")
-            file.write(segment)
-            file.close()
-            i += 1
-
-    for label in data_set:
-        # Shuffle and sort the data into sets.
-        if not no_shuffle: shuffle(data_set[label])
-        main, secondary = data_sorter(data_set[label])
-
-        # Write the first set.
-        main_label_path = f"{main_path}{label}/"
-        writeToPath(main_label_path, main)
-
-        # If the sorter create two sets, write the second set.
-        if secondary:
-            secondary_label_path = f"{secondary_path}{label}/"
-            writeToPath(secondary_label_path, secondary)
-
-
-# Create a sorter that divide the data into two sets based on the ratio (float).
-#   NOTE: mainly used for train sets.
-#   SPECIAL CASE USE: setting the ratio to 1 put all the data in the first set
-def ratioBasedSorter(ratio):
-    def data_sorter(data):
-        return data[:int(len(data) * ratio)], data[int(len(data) * ratio):]
-
-    return data_sorter
-
-
-# Create a sorter that divide the data into two sets based on the amount (int).
-#   NOTE: mainly used for test sets.
-#   SPECIAL CASE USE: setting the amount to 0 put all the data in the first set
-def amountBasedSorter(amount):
-    def data_sorter(data):
-        return data[amount:], data[:amount]
-
-    return data_sorter
-
-
-# Create a sorter that divide the data into two sets train and test based on the amount
-#   (float). The function start by taking all data with the word "rambam" (in hebrew)
-#   and put it in the train set with respect to the requested amount. If in the end
-#   the amount was not filled it will be filled with data from the test set.
-#   NOTE: mainly used for test sets.
-def rambamSpecificSorter(amount):
-    def data_sorter(data):
-        segment_to_add = amount
-        train = []
-        test = []
-
-        # Search for segment with the word "rambam" (in hebrew) and put them in the train.
-        for segment in data:
-            if (('רמב"ם' in segment) or ('רמבם' in segment)) and segment_to_add:
-                segment_to_add -= 1
-                train.append(segment)
-            else:
-                test.append(segment)
-
-        # Add segment if the amount wasn't filled.
-        if segment_to_add:
-            train.extend(test[:segment_to_add])
-            test = test[segment_to_add:]
-
-        return test, train
-
-    return data_sorter
-
-
-# The function reduce the number of file in a set to.
-def reduceSetFile(path, amount):
-    # Since the files start from 0 and not 1.
-    amount -= 1
-
-    # Delete files greater then amount
-    for folder in glob.glob(path + "/*"):
-        for file in glob.glob(folder + "/*"):
-            name = int(file.split('#')[1].split('.')[0])
-            if name > amount:
-                os.remove(file)
-
-
-# The main function. If unsure use it as it can built all possible sets.
-def main(parser):
-    print("Clean the set path.")
-    # Set the folders of the sets and get the pathes
-    train_set_path, test_set_path = setFolderHandler(parser.set_path, True)
-
-    print("Build the Rambam train set.")
-    # Build the Rambam train set.
-    sorter = ratioBasedSorter(parser.train_ratio)
-    path = f"{parser.train_path}/{RAMBAM_PATH}"
-    data_set = de.rambam_extractor(path)
-    buildSet(data_set, sorter, train_set_path, test_set_path, parser.no_shuffle)
-
-    # Build the other sources for the train.
-    if not parser.only_rambam:
-        print("Build the other train set.")
-        # The Rambam file should be in relation to the rest so they need to be reduced.
-        reduceSetFile(train_set_path, REDUCED_TO_AMOUNT)
-
-        # All the data goes to the train.
-        sorter = ratioBasedSorter(1.)
-
-        # Build the Chinuch set into the train set.
-        path = f"{parser.train_path}/{CHINUCH_PATH}"
-        data_set = de.chinuch_extractor(path)
-        buildSet(data_set, sorter, train_set_path, test_set_path, parser.no_shuffle)
-
-        # Build the Noda Biyhudah set into the train set.
-        path = f"{parser.train_path}/{NODA_BIYHUDAH_PATH}"
-        data_set = de.noda_biyhudah_extractor(path)
-        buildSet(data_set, sorter, train_set_path, test_set_path, parser.no_shuffle)
-
-    print("Build the Rambam test set.")
-    # If the test set is the Rambam it was alredy built with the sorter of the Rambam.
-    if parser.test_source == "rambam":
-        return train_set_path, test_set_path
-
-    # Build the Ben Ish Hai set into the test set.
-    elif parser.test_source == "ben":
-        path = f"{parser.test_path}/{BEN_ISH_HAI_PATH}"
-        data_set = de.ben_ish_hai_extractor(path)
-
-    # Build the Kizur Shulchan Aruch set into the test set.
-    elif parser.test_source == "kizur":
-        path = f"{parser.test_path}/{KIZUR_SHULCHAN_ARUCH_PATH}"
-        data_set = de.kizur_shulchan_aruch_extractor(path)
-
-    # Build the Tur set into the test set.
-    elif parser.test_source == "tur":
-        path = f"{parser.test_path}/{TUR_PATH}"
-        data_set = de.tur_extractor(path)
-
-    # Set the sorter for the test.
-    #   NOTE: choosing "amount" or "rambam" will build some of the test set into
-    #   the train set.
-    if parser.test_sorter == "full":
-        sorter = amountBasedSorter(0)
-    elif parser.test_sorter == "amount":
-        sorter = amountBasedSorter(parser.test_amount)
-    elif parser.test_sorter == "rambam":
-        sorter = rambamSpecificSorter(parser.test_amount)
-
-    buildSet(data_set, sorter, test_set_path, train_set_path)
-    fillTestLabels(train_set_path, test_set_path)
-
-    # Return the pathes of the train and test sets.
-    return train_set_path, test_set_path
-
-
-if __name__ == '__main__':
-    parser = ArgumentParser(description="Rambam data handler")
-    parser.add_argument("--train_path",
-                        type=str,
-                        default="./data/train_data/",
-                        help="Set the path to the data that the classifier will use for training.")
-    parser.add_argument("--test_path",
-                        type=str,
-                        default="./data/test_data/",
-                        help="Set the path to the data that the classifier will be tested on.")
-    parser.add_argument("--set_path",
-                        type=str,
-                        default="./data_set/",
-                        help="Set the path that the program will use to storeage the data set. NOTE: will be deleted when finished.")
-    parser.add_argument("--no_shuffle",
-                        action="store_true",
-                        help="The train sets Will NOT be shuffled. NOTE:if divided train to train-test it's best to use shuffle.")
-    parser.add_argument("--train_ratio",
-                        type=float,
-                        choices=[x / 100 for x in range(50, 101)],
-                        default=1.,
-                        help="set the ratio for the train-test divider. NOTE: putting 1 will send all the files to the train set.")
-    parser.add_argument("--test_amount",
-                        type=int,
-                        default=20,
-                        help="set the amount for the test-train divider. NOTE: putting 0 will send all the files to the test set.")
-    parser.add_argument("--test_sorter",
-                        type=str,
-                        choices=["full", "amount", "rambam"],
-                        default="full",
-                        help="set the test-train divider")
-    parser.add_argument("--only_rambam",
-                        action="store_true",
-                        help="will use only the rambam for the train set")
-    parser.add_argument("--test_source",
-                        type=str,
-                        choices=["rambam", "ben", "kizur", "tur"],
-                        default="rambam",
-                        help="set the source for the test.")
-
-    # Run the program itself with the parameters
-    parser = parser.parse_args()
-
-    # If the test set is the rambam the ratio need to divide it thus it cannot be 1
-    #   as 1 put all the data in the train set.
-    if (parser.test_source == "rambam") and (parser.train_ratio == 1.):
-        print("The usage of the rambam as a test set can't have train ratio of 1")
-        sys.exit(0)
-
-    main(parser)
+#!/usr/bin/env python
+from argparse import ArgumentParser
+from collections import defaultdict
+from . import dataset_extractor as de
+from . import instrumentation as it
+from . import corpus_store as cs
+from functools import partial
+from tempfile import mkdtemp
+from shutil import rmtree
+import numpy as np
+from random import shuffle, seed
+import glob
+import sys
+import os
+
+RAMBAM_PATH = "Rambam/"
+CHINUCH_PATH = "Chinuch/Chinuch.txt"
+NODA_BIYHUDAH_PATH = "Noda_Biyhudah/Noda Biyhudah.txt"
+BEN_ISH_HAI_PATH = "Ben-Ish Hai/"
+KIZUR_SHULCHAN_ARUCH_PATH = "Kizur Shulchan Aruch/"
+TUR_PATH = "Tur/"
+REDUCED_TO_AMOUNT = 40
+
+# The function take a path that the train and test sets will be put in and clean it.
+#   if the initialize is True the function also ready the folder for building the sets.
+#   The old folder is first moved aside (a single rename) and then removed as one tree, so
+#   the path is never left half deleted.
+def setFolderHandler(path, initialize=False):
+    # Clean the folders in the path.
+    try:
+        if os.path.isdir(path):
+            trash = mkdtemp(prefix=".deleted_set_", dir=os.path.dirname(os.path.abspath(path)))
+            os.rename(path, os.path.join(trash, "set"))
+            rmtree(trash)
+
+    except Exception as e:
+        print(f"The program can't delete the folder at {path}. Please delete it manually before rerunning the program.")
+        sys.exit(0)
+
+    # set the path and make the train and test sets folders.
+    if initialize:
+        train_set_path = path + "/train_set/"
+        test_set_path = path + "/test_set/"
+
+        os.makedirs(train_set_path)
+        os.mkdir(test_set_path)
+
+        return train_set_path, test_set_path
+
+
+# The function return the nuber of the next file to write in the label folder and make the
+#   folder if it didn't exist. The nubers are kept in counts (path to nuber) so the folder
+#   is listed only the first time it is written to and only if it already existed.
+def nextFile(path, counts):
+    if path not in counts:
+        try:
+            os.mkdir(path)
+            counts[path] = 0
+        except FileExistsError:
+            counts[path] = len(os.listdir(path))
+
+    return counts[path]
+
+
+# The function take all the labels at the train sets and make sure they exist in the
+#   test set folder since the pipe need to get all the labels he was trained on. (Helps
+#   if the test set don't contain all the labels)
+def fillTestLabels(train_set_path, test_set_path):
+    # Get the labels from the train set.
+    for label in os.listdir(train_set_path):
+        # Check the label exist in the test set otherwise it make a empty folder for the label.
+        path = test_set_path + label
+        if not os.path.isdir(path):
+            os.mkdir(path)
+
+
+# the function take a data set in the form of defaultdict(list) where the keys are the label,
+#   a sorter (to sort the data to main and secondary set), and at least one set path to write
+#   the data in. if the sorter divide the data into two sets a secondary path should be given.
+#   The function then take sort and write the data set and essentially 'build' the sets.
+#   NOTE: the function shuffle the data before dividing it unless no_shuffle set True.
+def buildSet(data_set, data_sorter, main_path, secondary_path=None, no_shuffle=False, counts=None):
+    # The nuber of the next file to write in each label folder (see 'nextFile').
+    counts = {} if counts is None else counts
+
+    # The sub-function take path and data and write the data into files.
+    #   The sub-function write the files as a continuation of the files already in the
+    #   path as '#i.txt' where the 'i' is the following number starting with 0.
+    def writeToPath(path, data):
+        i = nextFile(path, counts)
+
+        # Write the data to the path.
+        for segment in data:
+            with open(f"{path}#{i}.txt", "w", encoding="utf8") as file:
+                file.write(segment)
+            i += 1
+
+        counts[path] = i
+
+    for label in data_set:
+        # Shuffle and sort the data into sets.
+        if not no_shuffle: shuffle(data_set[label])
+        main, secondary = data_sorter(data_set[label])
+
+        # Write the first set.
+        main_label_path = f"{main_path}{label}/"
+        writeToPath(main_label_path, main)
+
+        # If the sorter create two sets, write the second set.
+        if secondary:
+            secondary_label_path = f"{secondary_path}{label}/"
+            writeToPath(secondary_label_path, secondary)
+
+
+# The in-memory counterpart of 'buildSet'. Instead of paths the function take the sets
+#   themselves in the form of defaultdict(list) where the keys are the label, and extend
+#   them with the sorted data. No file is written to the disk.
+#   NOTE: the function shuffle the data before dividing it unless no_shuffle set True.
+def buildMemorySet(data_set, data_sorter, main_set, secondary_set=None, no_shuffle=False):
+    for label in data_set:
+        # Shuffle and sort the data into sets.
+        if not no_shuffle: shuffle(data_set[label])
+        main, secondary = data_sorter(data_set[label])
+
+        # Add the data to the first set.
+        main_set[label].extend(main)
+
+        # If the sorter create two sets, add the data to the second set.
+        if secondary:
+            secondary_set[label].extend(secondary)
+
+
+# The function take a stream of (label, segment) pairs (see the '<name>_stream' extractors)
+#   and write every segment to the main path as it arrive, so the data is never held in
+#   memory. The files are written as a continuation of the files already in the path
+#   (see 'buildSet'). NOTE: all the data goes to the main set and it is not shuffled.
+def buildStreamSet(data_stream, main_path, counts=None):
+    # The nuber of the next file to write in each label folder (see 'nextFile').
+    counts = {} if counts is None else counts
+    for label, segment in data_stream:
+        path = f"{main_path}{label}/"
+        i = nextFile(path, counts)
+        with open(f"{path}#{i}.txt", "w", encoding="utf8") as file:
+            file.write(segment)
+        counts[path] = i + 1
+
+
+# The corpus store counterpart of 'buildSet'. The data is written to the corpus store
+#   (a 'corpus_store.StoreWriter') and the sets are in the form of defaultdict(list) where
+#   the keys are the label and the values are the arrays of the segment numbers in the
+#   store. The data is shuffled and sorted as a view of the store (see 'corpus_store') so
+#   the sorters only slice the arrays of the numbers.
+#   NOTE: the function shuffle the data before dividing it unless no_shuffle set True.
+def buildStoreSet(data_set, data_sorter, main_set, secondary_set=None, no_shuffle=False, writer=None):
+    for label in data_set:
+        # Shuffle and sort the data into sets.
+        view = cs.SegmentView(writer, writer.add(label, data_set[label]))
+        if not no_shuffle: view = view.shuffled()
+        main, secondary = data_sorter(view)
+
+        # Add the numbers of the data to the first set.
+        main_set[label].append(main.indices)
+
+        # If the sorter create two sets, add the numbers of the data to the second set.
+        if secondary:
+            secondary_set[label].append(secondary.indices)
+
+
+# The corpus store counterpart of 'buildStreamSet'. Write every segment of the stream to the
+#   corpus store and add its number to the main set (see 'buildStoreSet').
+#   NOTE: all the data goes to the main set and it is not shuffled.
+def buildStoreStreamSet(data_stream, main_set, writer=None):
+    numbers = defaultdict(list)
+    for label, segment in data_stream:
+        numbers[label].append(writer.append(label, segment))
+
+    for label in numbers:
+        main_set[label].append(np.array(numbers[label], dtype=np.int64))
+
+
+# The in-memory counterpart of 'buildStreamSet'. Add every segment of the stream to the
+#   main set. NOTE: all the data goes to the main set and it is not shuffled.
+def buildMemoryStreamSet(data_stream, main_set):
+    for label, segment in data_stream:
+        main_set[label].append(segment)
+
+
+# Create a sorter that divide the data into two sets based on the ratio (float).
+#   NOTE: mainly used for train sets.
+#   SPECIAL CASE USE: setting the ratio to 1 put all the data in the first set
+def ratioBasedSorter(ratio):
+    def data_sorter(data):
+        return data[:int(len(data) * ratio)], data[int(len(data) * ratio):]
+
+    return data_sorter
+
+
+# Create a sorter that reduce the first set of the sorter to the amount (int), so the data
+#   is reduced before it is built (see 'reduceSetFile').
+def reducedSorter(data_sorter, amount):
+    def reduced_sorter(data):
+        main, secondary = data_sorter(data)
+        return main[:amount], secondary
+
+    return reduced_sorter
+
+
+# Create a sorter that divide the data into two sets based on the amount (int).
+#   NOTE: mainly used for test sets.
+#   SPECIAL CASE USE: setting the amount to 0 put all the data in the first set
+def amountBasedSorter(amount):
+    def data_sorter(data):
+        return data[amount:], data[:amount]
+
+    return data_sorter
+
+
+# Create a sorter that divide the data into two sets train and test based on the amount
+#   (float). The function start by taking all data with the word "rambam" (in hebrew)
+#   and put it in the train set with respect to the requested amount. If in the end
+#   the amount was not filled it will be filled with data from the test set.
+#   NOTE: mainly used for test sets.
+def rambamSpecificSorter(amount):
+    # The sub-function return the items of the data (a list or a corpus store view) by
+    #   their places.
+    def take(data, places):
+        if isinstance(data, cs.SegmentView):
+            return data[np.array(places, dtype=np.int64)]
+
+        return [data[i] for i in places]
+
+    def data_sorter(data):
+        segment_to_add = amount
+        train = []
+        test = []
+
+        # Search for segment with the word "rambam" (in hebrew) and put them in the train.
+        for i, segment in enumerate(data):
+            if (('רמב"ם' in segment) or ('רמבם' in segment)) and segment_to_add:
+                segment_to_add -= 1
+                train.append(i)
+            else:
+                test.append(i)
+
+        # Add segment if the amount wasn't filled.
+        if segment_to_add:
+            train.extend(test[:segment_to_add])
+            test = test[segment_to_add:]
+
+        return take(data, test), take(data, train)
+
+    return data_sorter
+
+
+# The function reduce the number of file in a set to.
+def reduceSetFile(path, amount):
+    # Since the files start from 0 and not 1.
+    amount -= 1
+
+    # Delete files greater then amount
+    for folder in glob.glob(path + "/*"):
+        for file in glob.glob(folder + "/*"):
+            name = int(file.split('#')[1].split('.')[0])
+            if name > amount:
+                os.remove(file)
+
+
+# The in-memory counterpart of 'fillTestLabels'. Make sure every label of the train set
+#   exist in the test set.
+def fillMemoryTestLabels(train_set, test_set):
+    for label in train_set:
+        # Accessing the defaultdict add an empty list for a missing label.
+        test_set[label]
+
+
+# The function return the built train and test sets of 'main'. The sets of a corpus store
+#   (when the writer of the store is given) are returned as views of the store after the
+#   store is written (see 'corpus_store').
+def finishSets(writer, train_set, test_set):
+    if writer is None:
+        return train_set, test_set
+
+    with it.stage("write_corpus_store"):
+        store = writer.close()
+    return store.view(train_set), store.view(test_set)
+
+
+# The function return the train source files of the train path (as 'main' use them) by
+#   their path relative to the train path (so the same data in another train path is the
+#   same source), each with its file, its file extractor and a function that stream its
+#   (label, segment) pairs.
+def trainSources(parser):
+    files = {}
+    for file in sorted(glob.glob(f"{parser.train_path}/{RAMBAM_PATH}/*")):
+        files[file] = (de.rambam_file_extractor,
+                       partial(de.extract_file, de.rambam_file_extractor, file, parser.cache_path))
+
+    if not parser.only_rambam:
+        for path, file_extractor, stream in (
+                (CHINUCH_PATH, de.chinuch_file_extractor, de.chinuch_stream),
+                (NODA_BIYHUDAH_PATH, de.noda_biyhudah_file_extractor, de.noda_biyhudah_stream)):
+            file = f"{parser.train_path}/{path}"
+            if os.path.isfile(file):
+                files[file] = (file_extractor, partial(stream, file, parser.cache_path))
+
+    return {os.path.relpath(file, parser.train_path).replace(os.sep, "/"): (file,) + source
+            for file, source in files.items()}
+
+
+# The function return the hashes of the train sources (see 'trainSources'). The hash
+#   change with the file (and its label) and with the settings of its extractor.
+def sourceHashes(parser):
+    return {source: de.cache_key(file_extractor, file)
+            for source, (file, file_extractor, _) in trainSources(parser).items()}
+
+
+# The function take the hashes of the train sources a pipe was trained on and return the
+#   in-memory train set (see 'buildMemorySet') of only the new or changed sources and the
+#   hashes of all the current sources. The unchanged sources aren't extracted. The Rambam
+#   files are divided and reduced like in 'main', so their test part stay out of the train.
+def changedSources(parser, source_hashes):
+    # Seed the shuffle of the set.
+    if parser.seed is not None:
+        seed(parser.seed)
+
+    sources = trainSources(parser)
+    hashes = sourceHashes(parser)
+    changed = [source for source in sources if source_hashes.get(source) != hashes[source]]
+    print(f"Found {len(changed)} new or changed train sources out of {len(sources)}.")
+
+    sorter = ratioBasedSorter(parser.train_ratio)
+    if not parser.only_rambam:
+        sorter = reducedSorter(sorter, REDUCED_TO_AMOUNT)
+
+    train_set, test_set = defaultdict(list), defaultdict(list)
+    for source in changed:
+        _, file_extractor, stream = sources[source]
+        if file_extractor is de.rambam_file_extractor:
+            buildMemorySet(de.collect_segments(stream()), sorter, train_set, test_set, parser.no_shuffle)
+        else:
+            buildMemoryStreamSet(stream(), train_set)
+
+    return train_set, hashes
+
+
+# The function return the stream of (label, segment) pairs of a test source ("ben", "kizur"
+#   or "tur") in the test path.
+def testSourceStream(parser, test_source, processes=None):
+    processes = parser.processes if processes is None else processes
+
+    # The Ben Ish Hai set.
+    if test_source == "ben":
+        path = f"{parser.test_path}/{BEN_ISH_HAI_PATH}"
+        return de.ben_ish_hai_stream(path, processes, parser.cache_path)
+
+    # The Kizur Shulchan Aruch set.
+    elif test_source == "kizur":
+        path = f"{parser.test_path}/{KIZUR_SHULCHAN_ARUCH_PATH}"
+        return de.kizur_shulchan_aruch_stream(path, processes, parser.cache_path)
+
+    # The Tur set.
+    elif test_source == "tur":
+        path = f"{parser.test_path}/{TUR_PATH}"
+        return de.tur_stream(path, processes, parser.cache_path)
+
+
+# The main function. If unsure use it as it can built all possible sets.
+#   If in_memory is True the sets are built as defaultdict(list) (label to segments) and
+#   returned instead of the pathes, and nothing is written to the set path.
+#   If the parser corpus_store is True the data is written to a corpus store in the set
+#   path and the sets are returned as views of the store (see 'corpus_store').
+def main(parser, in_memory=False):
+    # Seed the shuffle of the sets.
+    if parser.seed is not None:
+        seed(parser.seed)
+
+    # The writer of the corpus store (if the sets are built in a corpus store).
+    writer = None
+
+    if in_memory:
+        train_set, test_set = defaultdict(list), defaultdict(list)
+        build_set, fill_test_labels, build_stream_set = buildMemorySet, fillMemoryTestLabels, buildMemoryStreamSet
+
+    elif parser.corpus_store:
+        print("Clean the set path.")
+        with it.stage("clean_set_folder"):
+            setFolderHandler(parser.set_path)
+        writer = cs.StoreWriter(f"{parser.set_path}/corpus/")
+        train_set, test_set = defaultdict(list), defaultdict(list)
+        build_set, fill_test_labels = partial(buildStoreSet, writer=writer), fillMemoryTestLabels
+        build_stream_set = partial(buildStoreStreamSet, writer=writer)
+
+    else:
+        print("Clean the set path.")
+        # Set the folders of the sets and get the pathes
+        with it.stage("clean_set_folder"):
+            train_set, test_set = setFolderHandler(parser.set_path, True)
+        # The builders share the nubers of the files of each label so no folder is listed.
+        counts = {}
+        build_set, fill_test_labels = partial(buildSet, counts=counts), fillTestLabels
+        build_stream_set = partial(buildStreamSet, counts=counts)
+
+    print("Build the Rambam train set.")
+    # Build the Rambam train set.
+    sorter = ratioBasedSorter(parser.train_ratio)
+    # The Rambam train set should be in relation to the other sources so it is reduced
+    #   before it is built.
+    if not parser.only_rambam:
+        sorter = reducedSorter(sorter, REDUCED_TO_AMOUNT)
+    path = f"{parser.train_path}/{RAMBAM_PATH}"
+    with it.stage("extract_rambam") as counts:
+        data_set = de.rambam_extractor(path, parser.processes, parser.cache_path)
+        counts.update(documents=sum(len(segments) for segments in data_set.values()),
+                      labels=len(data_set))
+    with it.stage("build_set_rambam"):
+        build_set(data_set, sorter, train_set, test_set, parser.no_shuffle)
+
+    # Build the other sources for the train.
+    if not parser.only_rambam:
+        print("Build the other train set.")
+        # All the data goes to the train so it is streamed into the train set (the stages
+        #   are of the extraction and the building together).
+        # Build the Chinuch set into the train set.
+        path = f"{parser.train_path}/{CHINUCH_PATH}"
+        with it.stage("extract_build_chinuch") as counts:
+            build_stream_set(it.counted(de.chinuch_stream(path, parser.cache_path), counts), train_set)
+
+        # Build the Noda Biyhudah set into the train set.
+        path = f"{parser.train_path}/{NODA_BIYHUDAH_PATH}"
+        with it.stage("extract_build_noda_biyhudah") as counts:
+            build_stream_set(it.counted(de.noda_biyhudah_stream(path, parser.cache_path), counts),
+                             train_set)
+
+    print("Build the Rambam test set.")
+    # If the test set is the Rambam it was alredy built with the sorter of the Rambam.
+    if parser.test_source == "rambam":
+        return finishSets(writer, train_set, test_set)
+
+    data_stream = testSourceStream(parser, parser.test_source)
+
+    # Set the sorter for the test.
+    #   NOTE: choosing "amount" or "rambam" will build some of the test set into
+    #   the train set.
+    if parser.test_sorter == "full":
+        # All the data goes to the test so it is streamed into the test set.
+        with it.stage(f"extract_build_{parser.test_source}") as counts:
+            build_stream_set(it.counted(data_stream, counts), test_set)
+    else:
+        if parser.test_sorter == "amount":
+            sorter = amountBasedSorter(parser.test_amount)
+        elif parser.test_sorter == "rambam":
+            sorter = rambamSpecificSorter(parser.test_amount)
+
+        with it.stage(f"extract_{parser.test_source}") as counts:
+            data_set = de.collect_segments(data_stream)
+            counts.update(documents=sum(len(segments) for segments in data_set.values()),
+                          labels=len(data_set))
+        with it.stage(f"build_set_{parser.test_source}"):
+            build_set(data_set, sorter, test_set, train_set)
+
+    with it.stage("fill_test_labels"):
+        fill_test_labels(train_set, test_set)
+
+    # Return the train and test sets (pathes, in-memory sets or corpus store views).
+    return finishSets(writer, train_set, test_set)
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description="Rambam data handler")
+    parser.add_argument("--train_path",
+                        type=str,
+                        default="./data/train_data/",
+                        help="Set the path to the data that the classifier will use for training.")
+    parser.add_argument("--test_path",
+                        type=str,
+                        default="./data/test_data/",
+                        help="Set the path to the data that the classifier will be tested on.")
+    parser.add_argument("--set_path",
+                        type=str,
+                        default="./data_set/",
+                        help="Set the path that the program will use to storeage the data set. NOTE: will be deleted when finished.")
+    parser.add_argument("--temp_set",
+                        action="store_true",
+                        help="Build the sets in a new temporary folder (its path is printed) instead of the set path, so runs at the same time don't collide.")
+    parser.add_argument("--corpus_store",
+                        action="store_true",
+                        help="Build the train and test sets as arrays of segment numbers over a single memory mapped corpus file in the set path instead of a file for each segment.")
+    parser.add_argument("--processes",
+                        type=int,
+                        default=1,
+                        help="Set the number of processes used to extract the data files. NOTE: putting 0 will use all the cores.")
+    parser.add_argument("--cache_path",
+                        type=str,
+                        default="",
+                        help="Set the path that the program will use to cache the extracted segments of each data file (like './extraction_cache/'). NOTE: empty path (default) disable the cache, so nothing is written to the disk with in_memory.")
+    parser.add_argument("--no_shuffle",
+                        action="store_true",
+                        help="The train sets Will NOT be shuffled. NOTE:if divided train to train-test it's best to use shuffle.")
+    parser.add_argument("--seed",
+                        type=int,
+                        default=None,
+                        help="Set the seed of the shuffle of the sets so the run can be repeated.")
+    parser.add_argument("--train_ratio",
+                        type=float,
+                        choices=[x / 100 for x in range(50, 101)],
+                        default=1.,
+                        help="set the ratio for the train-test divider. NOTE: putting 1 will send all the files to the train set.")
+    parser.add_argument("--test_amount",
+                        type=int,
+                        default=20,
+                        help="set the amount for the test-train divider. NOTE: putting 0 will send all the files to the test set.")
+    parser.add_argument("--test_sorter",
+                        type=str,
+                        choices=["full", "amount", "rambam"],
+                        default="full",
+                        help="set the test-train divider")
+    parser.add_argument("--only_rambam",
+                        action="store_true",
+                        help="will use only the rambam for the train set")
+    parser.add_argument("--test_source",
+                        type=str,
+                        choices=["rambam", "ben", "kizur", "tur"],
+                        default="rambam",
+                        help="set the source for the test.")
+
+    # Run the program itself with the parameters
+    parser = parser.parse_args()
+
+    # If the test set is the rambam the ratio need to divide it thus it cannot be 1
+    #   as 1 put all the data in the train set.
+    if (parser.test_source == "rambam") and (parser.train_ratio == 1.):
+        print("The usage of the rambam as a test set can't have train ratio of 1")
+        sys.exit(0)
+
+    # Build the sets in a new temporary folder (the sets are kept, its path is printed).
+    if parser.temp_set:
+        parser.set_path = mkdtemp(prefix="data_set_")
+        print(f"The sets are built in '{parser.set_path}'.")
+
+    main(parser)
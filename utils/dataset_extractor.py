@@ -1,308 +1,457 @@
-from collections import defaultdict
-import glob
-import re
-
-WORDS_PER_SEGMENT = 100 # How Many words will be in each segment. 0 set to default for each data set.
-MAX_ADD_TO_LABEL = 15 # for 'chinuch_extractor' and 'noda_biyhudah_extractor'.
-
-
-# Extract the data sets from Rambam text.
-def rambam_extractor(path):
-    return_data = defaultdict(list)
-    for file in glob.glob(path + '/*'):
-        # the label is the name of the file.
-        label = file.rsplit('\\', 1)[1].split('.')[0]
-        data = ''
-        for line in open(file, 'r', encoding="utf8"):
-            if line == '\n':
-                continue
-
-            line = line.strip()
-
-            # Skip the line that indicate number of the Halacha in the file.
-            if "הלכות" in line:
-                continue
-            else:
-                # Edit the file for the data e.g. delete double space and symbols.
-                line = line.split("  ", 1)[1]
-
-                line = re.sub(r'\s\([^()]*\)', '', line)
-                line = re.sub(r'\[[^()]*\]\s', '', line)
-
-                line = re.sub('[,.;:)("]', '', line)
-                line = line.replace("--", ' ')
-                line = line.replace('-', ' ')
-                line = line.replace("  ", ' ')
-
-                # Add the line to the data from the file
-                if data:
-                    data += ' ' + line
-                else:
-                    data = line
-
-        # Split the data into segment each of size NUM_OF_WORDS.
-        data = data.split()
-        # Set the divider by words.
-        if WORDS_PER_SEGMENT < 1:
-            words = 100
-        else:
-            words = WORDS_PER_SEGMENT
-
-        data = [' '.join(data[word : word + words]) for word in range(0, len(data), words)]
-        return_data[label] = data
-
-    return(return_data)
-
-
-# Extract the data sets from Ben Ish Hai text.
-def ben_ish_hai_extractor(path):
-    return_data = defaultdict(list)
-    for file in glob.glob(path + '/*'):
-        # the label is the name of the file.
-        label = file.rsplit('\\', 1)[1].split('.')[0]
-        data = ''
-        for line in open(file, 'r', encoding="utf8"):
-            if (line == '\n') or (line[0].isdigit()) or ("בן איש חי – הלכות" in line):
-                continue
-
-            line = line.strip()
-            sline = line.split()
-            # If the result is True put the segment in the set and start a new segment.
-            if (len(sline) == 2) and (sline[0] == "אות"):
-                if data:
-                    return_data[label].append(data)
-                    data = ''
-
-            else:
-                # Edit the file for the data e.g. delete utf-8 bom and symbols.
-                line = re.sub('[,.;:)(]', '', line)
-                # Remove utf-8 bom
-                bom = line[0].encode("utf-8")
-                if bom == b'\xef\xbb\xbf':
-                    line = line[1:]
-
-                # Add the line to the data.
-                if data:
-                    data += ' ' + line
-                else:
-                    data = line
-
-        if data:
-            return_data[label].append(data)
-
-    # Check if the data need to be divided by words and not by section.
-    if WORDS_PER_SEGMENT > 0:
-        for label in return_data:
-            # Rejoin and split the data acording to WORDS_PER_SEGMENT
-            data = ' '.join(return_data[label])
-            data = data.split()
-            data = [' '.join(data[word : word + WORDS_PER_SEGMENT]) for word in range(0, len(data), WORDS_PER_SEGMENT)]
-            return_data[label] = data
-
-    return return_data
-
-
-# Extract the data sets from Chinuch text. The number of segemnt in each label is limited
-#   by MAX_ADD_TO_LABEL
-def chinuch_extractor(path):
-    return_data = defaultdict(list)
-    data = ''
-    label = ''
-
-    for line in open(path, 'r', encoding="utf8"):
-        if line == '\n':
-            continue
-
-        line = line.strip()
-        sline = line.split()
-        # If the result is True put the segment in the set and start a new segment.
-        if sline[0] == '#':
-            if label and (len(return_data[label]) < MAX_ADD_TO_LABEL):
-                return_data[label].append(data)
-
-            data = ''
-            # the label is the name after the #.
-            label = line.split(' ', 1)[1]
-
-        else:
-            # Edit the file for the data e.g. delete utf-8 bom and symbols.
-            line = re.sub('[,.;:)(]', '', line)
-            # Remove utf-8 bom
-            bom = line[0].encode("utf-8")
-            if bom == b'\xef\xbb\xbf':
-                line = line[1:]
-
-            # Add the line to the data.
-            if data:
-                data += ' ' + line
-            else:
-                data = line
-
-    if label and (len(return_data[label]) < MAX_ADD_TO_LABEL):
-        return_data[label].append(data)
-
-    # Check if the data need to be divided by words and not by section.
-    if WORDS_PER_SEGMENT > 0:
-        for label in return_data:
-            # Rejoin and split the data acording to WORDS_PER_SEGMENT
-            data = ' '.join(return_data[label])
-            data = data.split()
-            data = [' '.join(data[word : word + WORDS_PER_SEGMENT]) for word in range(0, len(data), WORDS_PER_SEGMENT)]
-            return_data[label] = data
-
-    return return_data
-
-
-# Extract the data sets from Kizur Shulchan Aruch text.
-def kizur_shulchan_aruch_extractor(path):
-    return_data = defaultdict(list)
-    for file in glob.glob(path + '/*'):
-        # the label is the name of the file.
-        label = file.rsplit('\\', 1)[1].split('.')[0]
-        data = ''
-        for line in open(file, 'r', encoding="utf8"):
-            if line == '\n':
-                continue
-
-            line = line.strip()
-            sline = line.split()
-            # If the result is True put the segment in the set and start a new segment.
-            if (len(sline) == 2) and (sline[0] == "סעיף"):
-                if data:
-                    return_data[label].append(data)
-                    data = ''
-
-            else:
-                # Edit the file for the data e.g. delete utf-8 bom and symbols.
-                line = re.sub('[,.;:)(]', '', line)
-                # Remove utf-8 bom
-                bom = line[0].encode("utf-8")
-                if bom == b'\xef\xbb\xbf':
-                    line = line[1:]
-
-                # Add the line to the data.
-                if data:
-                    data += ' ' + line
-                else:
-                    data = line
-
-        if data:
-            return_data[label].append(data)
-
-    # Check if the data need to be divided by words and not by section.
-    if WORDS_PER_SEGMENT > 0:
-        for label in return_data:
-            # Rejoin and split the data acording to WORDS_PER_SEGMENT
-            data = ' '.join(return_data[label])
-            data = data.split()
-            data = [' '.join(data[word : word + WORDS_PER_SEGMENT]) for word in range(0, len(data), WORDS_PER_SEGMENT)]
-            return_data[label] = data
-
-    return return_data
-
-
-# Extract the data sets from Noda Biyhudah text. The number of segemnt in each label is limited
-#   by MAX_ADD_TO_LABEL
-def noda_biyhudah_extractor(path):
-    return_data = defaultdict(list)
-    data = ''
-    label = ''
-
-    for line in open(path, 'r', encoding="utf8"):
-        if line == '\n':
-            continue
-
-        line = line.strip()
-        sline = line.split()
-        # If the result is True put the segment in the set and start a new segment.
-        if sline[0] == "Teshuva":
-            if label and (len(return_data[label]) < MAX_ADD_TO_LABEL):
-                return_data[label].append(data)
-
-            data = ''
-            # the label is the after "Teshuva {i}".
-            sline = line.split(' ', 2)
-            if len(sline) == 3:
-                label = sline[2]
-            else:
-                label = ''
-
-
-        else:
-            # Edit the file for the data e.g. delete utf-8 bom and symbols.
-            line = line.replace("<b>", '')
-            line = line.replace("</b>", '')
-            line = re.sub('[,.;:)(]', '', line)
-
-            # Remove utf-8 bom
-            bom = line[0].encode("utf-8")
-            if bom == b'\xef\xbb\xbf':
-                line = line[1:]
-
-            # Add the line to the data.
-            if data:
-                data += ' ' + line
-            else:
-                data = line
-
-    if label and (len(return_data[label]) < MAX_ADD_TO_LABEL):
-        return_data[label].append(data)
-
-    # Check if the data need to be divided by words and not by section.
-    if WORDS_PER_SEGMENT > 0:
-        for label in return_data:
-            # Rejoin and split the data acording to WORDS_PER_SEGMENT
-            data = ' '.join(return_data[label])
-            data = data.split()
-            data = [' '.join(data[word : word + WORDS_PER_SEGMENT]) for word in range(0, len(data), WORDS_PER_SEGMENT)]
-            return_data[label] = data
-
-    return return_data
-
-
-# Extract the data sets from Tur text.
-def tur_extractor(path):
-    return_data = defaultdict(list)
-    for file in glob.glob(path + '/*'):
-        # the label is the name of the file.
-        label = file.rsplit('\\', 1)[1].split('.')[0]
-        data = ''
-        for line in open(file, 'r', encoding="utf8"):
-            if (line == '\n') or (line[0].isdigit()) or ("www" in line):
-                continue
-
-            line = line.strip()
-            sline = line.split()
-            # If the result is True put the segment in the set and start a new segment.
-            if (len(sline) == 2) and (sline[0] == "סימן"):
-                if data:
-                    return_data[label].append(data)
-                    data = ''
-
-            else:
-                # Edit the file for the data e.g. delete utf-8 bom and symbols.
-                line = re.sub('[,.;:)(]', '', line)
-                # Remove utf-8 bom
-                bom = line[0].encode("utf-8")
-                if bom == b'\xef\xbb\xbf':
-                    line = line[1:]
-
-                # Add the line to the data.
-                if data:
-                    data += ' ' + line
-                else:
-                    data = line
-
-        if data:
-            return_data[label].append(data)
-
-    # Check if the data need to be divided by words and not by section.
-    if WORDS_PER_SEGMENT > 0:
-        for label in return_data:
-            # Rejoin and split the data acording to WORDS_PER_SEGMENT
-            data = ' '.join(return_data[label])
-            data = data.split()
-            data = [' '.join(data[word : word + WORDS_PER_SEGMENT]) for word in range(0, len(data), WORDS_PER_SEGMENT)]
-            return_data[label] = data
-
-    return return_data
+from collections import defaultdict
+from multiprocessing import Pool
+from functools import partial
+import hashlib
+import pickle
+import glob
+import re
+import os
+
+WORDS_PER_SEGMENT = 100 # How Many words will be in each segment. 0 set to default for each data set.
+MAX_ADD_TO_LABEL = 15 # for 'chinuch_extractor' and 'noda_biyhudah_extractor'.
+EXTRACTOR_VERSION = 2 # Change when the extractors change so the cached segments are not used.
+
+# NOTE: every extractor has a streaming version ('<name>_stream') that yield (label, segment)
+#   pairs as the files are read instead of returning all the data at once.
+
+
+# Create a normalizer that clean a text (a line or a whole file) for the data sets. The
+#   patterns and the symbols are compiled once and deleted from the text, the symbols
+#   (and the utf-8 bom) in a single pass of one character class. If dashes is True the
+#   dashes are replaced by spaces.
+#   NOTE: a str.translate table is much slower than the character class on Hebrew text.
+def text_normalizer(symbols=',.;:)(', patterns=(), dashes=False):
+    patterns = [re.compile(pattern) for pattern in patterns]
+    symbols = re.compile('[' + re.escape(symbols + '\ufeff') + ']')
+
+    def normalize(text):
+        for pattern in patterns:
+            text = pattern.sub('', text)
+
+        text = symbols.sub('', text)
+        if dashes:
+            text = text.replace('-', ' ')
+
+        return text
+
+    return normalize
+
+
+# The normalizers of the extractors.
+RAMBAM_NORMALIZER = text_normalizer(',.;:)("', (r'\s\([^()]*\)', r'\[[^()]*\]\s'), dashes=True)
+NODA_BIYHUDAH_NORMALIZER = text_normalizer(patterns=(r'</?b>',))
+NORMALIZER = text_normalizer()
+
+
+# Divide the segments of a stream of (label, segment) pairs into new segments of the
+#   given number of words (the last one of each label can be shorter). Each label has a
+#   small buffer of words that slide over its segments, so the segments are never joined
+#   into one text and split again. The full segments are yielded as soon as they are
+#   ready and the rest of each label at the end of the stream.
+def resegment_stream(pairs, words):
+    buffers = {}
+    for label, segment in pairs:
+        buffer = buffers.setdefault(label, [])
+        buffer.extend(segment.split())
+        if len(buffer) >= words:
+            end = len(buffer) - (len(buffer) % words)
+            for word in range(0, end, words):
+                yield label, ' '.join(buffer[word : word + words])
+
+            del buffer[:end]
+
+    for label, buffer in buffers.items():
+        if buffer:
+            yield label, ' '.join(buffer)
+
+
+# Divide the segments into new segments of the given number of words (see 'resegment_stream').
+def resegment(segments, words):
+    for _, segment in resegment_stream(((None, segment) for segment in segments), words):
+        yield segment
+
+
+# Collect a stream of (label, segment) pairs into defaultdict(list) where the keys are the label.
+def collect_segments(pairs):
+    return_data = defaultdict(list)
+    for label, segment in pairs:
+        return_data[label].append(segment)
+
+    return return_data
+
+
+# Get the label of a file, the label is the name of the file.
+def file_label(file):
+    return os.path.basename(file).split('.')[0]
+
+
+# Get the key of the file in the extraction cache. The key is the hash of the content of the
+#   file, its label (the segments are cached with it), the extractor and everything that
+#   change the segments the extractor make.
+def cache_key(file_extractor, file):
+    key = hashlib.sha1(f"{file_extractor.__name__}|{EXTRACTOR_VERSION}|{WORDS_PER_SEGMENT}|"
+                       f"{MAX_ADD_TO_LABEL}|{file_label(file)}|".encode("utf-8"))
+    with open(file, "rb") as source:
+        for chunk in iter(lambda: source.read(2 ** 20), b''):
+            key.update(chunk)
+
+    return key.hexdigest()
+
+
+# Run the file_extractor on a file and return its (label, segment) pairs as a list so they
+#   can be sent back from the process pool. If cache_path is given the pairs are saved
+#   there and loaded in the next runs instead of extracting the file again. A file that
+#   changed (or a change of the settings) get a new key so the cache is never stale.
+def extract_file(file_extractor, file, cache_path=None):
+    if not cache_path:
+        return list(file_extractor(file))
+
+    cache_file = os.path.join(cache_path, cache_key(file_extractor, file) + ".pickle")
+    if os.path.isfile(cache_file):
+        try:
+            with open(cache_file, "rb") as cache:
+                return pickle.load(cache)
+        except Exception:
+            pass # Extract the file again if the cached file is damaged.
+
+    pairs = list(file_extractor(file))
+
+    # Write to a temporary file and replace so parallel runs never read a partial file.
+    os.makedirs(cache_path, exist_ok=True)
+    temp_file = f"{cache_file}.{os.getpid()}.tmp"
+    with open(temp_file, "wb") as cache:
+        pickle.dump(pairs, cache, pickle.HIGHEST_PROTOCOL)
+    os.replace(temp_file, cache_file)
+
+    return pairs
+
+
+# Run the file_extractor on every file in the path and yield the (label, segment) pairs.
+#   The file_extractor take a file and yield its pairs. The files are independent of each
+#   other so if processes is not 1 they are extracted in a process pool (0 to use all the
+#   cores). The files are sorted so the pairs are in the same order in both cases.
+#   If cache_path is given the files are extracted through the cache (see 'extract_file').
+def stream_files(path, file_extractor, processes=1, cache_path=None):
+    files = sorted(glob.glob(path + '/*'))
+    if processes == 1:
+        for file in files:
+            if cache_path:
+                yield from extract_file(file_extractor, file, cache_path)
+            else:
+                yield from file_extractor(file)
+
+    else:
+        with Pool(processes or None) as pool:
+            extractor = partial(extract_file, file_extractor, cache_path=cache_path)
+            for pairs in pool.imap(extractor, files):
+                yield from pairs
+
+
+# Extract the segments from a single Rambam file.
+def rambam_file_extractor(file):
+    # The sub-function yield the edited lines of the file.
+    def lines():
+        for line in open(file, 'r', encoding="utf8"):
+            if line == '\n':
+                continue
+
+            line = line.strip()
+
+            # Skip the line that indicate number of the Halacha in the file.
+            if "הלכות" in line:
+                continue
+            else:
+                # Edit the file for the data e.g. delete double space and symbols.
+                yield RAMBAM_NORMALIZER(line.split("  ", 1)[1])
+
+    # the label is the name of the file.
+    label = file_label(file)
+
+    # Set the divider by words.
+    if WORDS_PER_SEGMENT < 1:
+        words = 100
+    else:
+        words = WORDS_PER_SEGMENT
+
+    # Split the data into segment each of size NUM_OF_WORDS.
+    for segment in resegment(lines(), words):
+        yield label, segment
+
+
+# Stream the data sets from Rambam text.
+#   NOTE: if processes is not 1 the files are extracted in parallel and if cache_path is
+#   given they are extracted through the cache (see 'stream_files').
+def rambam_stream(path, processes=1, cache_path=None):
+    return stream_files(path, rambam_file_extractor, processes, cache_path)
+
+
+# Extract the data sets from Rambam text.
+def rambam_extractor(path, processes=1, cache_path=None):
+    return collect_segments(rambam_stream(path, processes, cache_path))
+
+
+# Extract the segments from a single Ben Ish Hai file.
+def ben_ish_hai_file_extractor(file):
+    # the label is the name of the file.
+    label = file_label(file)
+    data = []
+    for line in open(file, 'r', encoding="utf8"):
+        if (line == '\n') or (line[0].isdigit()) or ("בן איש חי – הלכות" in line):
+            continue
+
+        line = line.strip()
+        sline = line.split()
+        # If the result is True put the segment in the set and start a new segment.
+        if (len(sline) == 2) and (sline[0] == "אות"):
+            if data:
+                yield label, ' '.join(data)
+                data = []
+
+        else:
+            # Edit the file for the data e.g. delete utf-8 bom and symbols.
+            line = NORMALIZER(line)
+
+            # Add the line to the data.
+            if line:
+                data.append(line)
+
+    if data:
+        yield label, ' '.join(data)
+
+
+# Stream the data sets from Ben Ish Hai text.
+#   NOTE: if processes is not 1 the files are extracted in parallel and if cache_path is
+#   given they are extracted through the cache (see 'stream_files').
+def ben_ish_hai_stream(path, processes=1, cache_path=None):
+    pairs = stream_files(path, ben_ish_hai_file_extractor, processes, cache_path)
+
+    # Check if the data need to be divided by words and not by section.
+    if WORDS_PER_SEGMENT > 0:
+        # Divide the data acording to WORDS_PER_SEGMENT
+        pairs = resegment_stream(pairs, WORDS_PER_SEGMENT)
+
+    return pairs
+
+
+# Extract the data sets from Ben Ish Hai text.
+def ben_ish_hai_extractor(path, processes=1, cache_path=None):
+    return collect_segments(ben_ish_hai_stream(path, processes, cache_path))
+
+
+# Extract the segments from the Chinuch file. The number of segemnt in each label is
+#   limited by MAX_ADD_TO_LABEL
+def chinuch_file_extractor(path):
+    # Count the segments of each label.
+    counts = defaultdict(int)
+    data = []
+    label = ''
+
+    for line in open(path, 'r', encoding="utf8"):
+        if line == '\n':
+            continue
+
+        line = line.strip()
+        sline = line.split()
+        # If the result is True put the segment in the set and start a new segment.
+        if sline[0] == '#':
+            if label and (counts[label] < MAX_ADD_TO_LABEL):
+                counts[label] += 1
+                yield label, ' '.join(data)
+
+            data = []
+            # the label is the name after the #.
+            label = line.split(' ', 1)[1]
+
+        else:
+            # Edit the file for the data e.g. delete utf-8 bom and symbols.
+            line = NORMALIZER(line)
+
+            # Add the line to the data.
+            if line:
+                data.append(line)
+
+    if label and (counts[label] < MAX_ADD_TO_LABEL):
+        yield label, ' '.join(data)
+
+
+# Stream the data sets from Chinuch text. The number of segemnt in each label is limited
+#   by MAX_ADD_TO_LABEL. If cache_path is given the file is extracted through the cache
+#   (see 'extract_file').
+def chinuch_stream(path, cache_path=None):
+    if cache_path:
+        pairs = extract_file(chinuch_file_extractor, path, cache_path)
+    else:
+        pairs = chinuch_file_extractor(path)
+
+    # Check if the data need to be divided by words and not by section.
+    if WORDS_PER_SEGMENT > 0:
+        # Divide the data acording to WORDS_PER_SEGMENT
+        pairs = resegment_stream(pairs, WORDS_PER_SEGMENT)
+
+    return pairs
+
+
+# Extract the data sets from Chinuch text. The number of segemnt in each label is limited
+#   by MAX_ADD_TO_LABEL
+def chinuch_extractor(path, cache_path=None):
+    return collect_segments(chinuch_stream(path, cache_path))
+
+
+# Extract the segments from a single Kizur Shulchan Aruch file.
+def kizur_shulchan_aruch_file_extractor(file):
+    # the label is the name of the file.
+    label = file_label(file)
+    data = []
+    for line in open(file, 'r', encoding="utf8"):
+        if line == '\n':
+            continue
+
+        line = line.strip()
+        sline = line.split()
+        # If the result is True put the segment in the set and start a new segment.
+        if (len(sline) == 2) and (sline[0] == "סעיף"):
+            if data:
+                yield label, ' '.join(data)
+                data = []
+
+        else:
+            # Edit the file for the data e.g. delete utf-8 bom and symbols.
+            line = NORMALIZER(line)
+
+            # Add the line to the data.
+            if line:
+                data.append(line)
+
+    if data:
+        yield label, ' '.join(data)
+
+
+# Stream the data sets from Kizur Shulchan Aruch text.
+#   NOTE: if processes is not 1 the files are extracted in parallel and if cache_path is
+#   given they are extracted through the cache (see 'stream_files').
+def kizur_shulchan_aruch_stream(path, processes=1, cache_path=None):
+    pairs = stream_files(path, kizur_shulchan_aruch_file_extractor, processes, cache_path)
+
+    # Check if the data need to be divided by words and not by section.
+    if WORDS_PER_SEGMENT > 0:
+        # Divide the data acording to WORDS_PER_SEGMENT
+        pairs = resegment_stream(pairs, WORDS_PER_SEGMENT)
+
+    return pairs
+
+
+# Extract the data sets from Kizur Shulchan Aruch text.
+def kizur_shulchan_aruch_extractor(path, processes=1, cache_path=None):
+    return collect_segments(kizur_shulchan_aruch_stream(path, processes, cache_path))
+
+
+# Extract the segments from the Noda Biyhudah file. The number of segemnt in each label is
+#   limited by MAX_ADD_TO_LABEL
+def noda_biyhudah_file_extractor(path):
+    # Count the segments of each label.
+    counts = defaultdict(int)
+    data = []
+    label = ''
+
+    for line in open(path, 'r', encoding="utf8"):
+        if line == '\n':
+            continue
+
+        line = line.strip()
+        sline = line.split()
+        # If the result is True put the segment in the set and start a new segment.
+        if sline[0] == "Teshuva":
+            if label and (counts[label] < MAX_ADD_TO_LABEL):
+                counts[label] += 1
+                yield label, ' '.join(data)
+
+            data = []
+            # the label is the after "Teshuva {i}".
+            sline = line.split(' ', 2)
+            if len(sline) == 3:
+                label = sline[2]
+            else:
+                label = ''
+
+
+        else:
+            # Edit the file for the data e.g. delete utf-8 bom, bold tags and symbols.
+            line = NODA_BIYHUDAH_NORMALIZER(line)
+
+            # Add the line to the data.
+            if line:
+                data.append(line)
+
+    if label and (counts[label] < MAX_ADD_TO_LABEL):
+        yield label, ' '.join(data)
+
+
+# Stream the data sets from Noda Biyhudah text. The number of segemnt in each label is limited
+#   by MAX_ADD_TO_LABEL. If cache_path is given the file is extracted through the cache
+#   (see 'extract_file').
+def noda_biyhudah_stream(path, cache_path=None):
+    if cache_path:
+        pairs = extract_file(noda_biyhudah_file_extractor, path, cache_path)
+    else:
+        pairs = noda_biyhudah_file_extractor(path)
+
+    # Check if the data need to be divided by words and not by section.
+    if WORDS_PER_SEGMENT > 0:
+        # Divide the data acording to WORDS_PER_SEGMENT
+        pairs = resegment_stream(pairs, WORDS_PER_SEGMENT)
+
+    return pairs
+
+
+# Extract the data sets from Noda Biyhudah text. The number of segemnt in each label is limited
+#   by MAX_ADD_TO_LABEL
+def noda_biyhudah_extractor(path, cache_path=None):
+    return collect_segments(noda_biyhudah_stream(path, cache_path))
+
+
+# Extract the segments from a single Tur file.
+def tur_file_extractor(file):
+    # the label is the name of the file.
+    label = file_label(file)
+    data = []
+    for line in open(file, 'r', encoding="utf8"):
+        if (line == '\n') or (line[0].isdigit()) or ("www" in line):
+            continue
+
+        line = line.strip()
+        sline = line.split()
+        # If the result is True put the segment in the set and start a new segment.
+        if (len(sline) == 2) and (sline[0] == "סימן"):
+            if data:
+                yield label, ' '.join(data)
+                data = []
+
+        else:
+            # Edit the file for the data e.g. delete utf-8 bom and symbols.
+            line = NORMALIZER(line)
+
+            # Add the line to the data.
+            if line:
+                data.append(line)
+
+    if data:
+        yield label, ' '.join(data)
+
+
+# Stream the data sets from Tur text.
+#   NOTE: if processes is not 1 the files are extracted in parallel and if cache_path is
+#   given they are extracted through the cache (see 'stream_files').
+def tur_stream(path, processes=1, cache_path=None):
+    pairs = stream_files(path, tur_file_extractor, processes, cache_path)
+
+    # Check if the data need to be divided by words and not by section.
+    if WORDS_PER_SEGMENT > 0:
+        # Divide the data acording to WORDS_PER_SEGMENT
+        pairs = resegment_stream(pairs, WORDS_PER_SEGMENT)
+
+    return pairs
+
+
+# Extract the data sets from Tur text.
+def tur_extractor(path, processes=1, cache_path=None):
+    return collect_segments(tur_stream(path, processes, cache_path))
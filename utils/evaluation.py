@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+from multiprocessing import Pool
+from . import svm_classification as sc
+from . import data_handler as dh
+from . import feature_store as fs
+from sklearn.exceptions import UndefinedMetricWarning
+from sklearn import metrics
+import numpy as np
+import warnings
+import json
+import csv
+
+# The test sources that are evaluated with all their data (the "full" test sorter).
+TEST_SOURCES = ("ben", "kizur", "tur")
+
+# The pipe, its label names and the arguments of the process (or worker process).
+WORKER_STATE = {}
+
+
+def initWorker(pipe, target_names, parser):
+    WORKER_STATE.update(pipe=pipe, target_names=np.array(target_names), parser=parser)
+
+
+# The function evaluate the pipe of the process on a test source and return the source and
+#   its results. The test set is the set of the source (a path or an in-memory set) or the
+#   full stream of the test source when not given.
+def evaluateSource(source, test_set=None):
+    pipe, target_names, parser = [WORKER_STATE[key] for key in ("pipe", "target_names", "parser")]
+    if test_set is None:
+        test_set = dh.testSourceStream(parser, source, processes=1)
+    test_set = sc.load_set(test_set, source)
+
+    # Compare the labels by their names, the test labels may differ from the train labels.
+    if parser.feature_store:
+        predicted = fs.predict(parser.feature_store, pipe, test_set)
+    else:
+        predicted = sc.predictSteps(pipe, test_set)
+    predicted = target_names[predicted]
+    expected = np.array(test_set.target_names)[test_set.target]
+
+    # The F1 scores are of the labels of the test source and the labels predicted for it, so
+    #   the segments predicted into any other label count against that label.
+    #   The recall of the labels that are only predicted is 0 (without the warning of sklearn).
+    labels = np.union1d(expected, predicted)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", UndefinedMetricWarning)
+        return source, {
+            "segments": len(expected),
+            "accuracy": 100 * np.mean(predicted == expected),
+            "macro_f1": 100 * metrics.f1_score(expected, predicted, labels=labels, average="macro"),
+            "weighted_f1": 100 * metrics.f1_score(expected, predicted, labels=labels, average="weighted"),
+            "report": metrics.classification_report(expected, predicted, labels=labels, output_dict=True),
+        }
+
+
+# The function evaluate the fitted pipe on all the test sources in parallel (see 'TEST_SOURCES')
+#   and on the Rambam test set (if it isn't empty) and write the results to
+#   '<output>.json' (with the classification report of each source) and a matrix of the
+#   sources and their accuracy and F1 scores to '<output>.csv'.
+#   NOTE: putting 0 processes will use all the cores.
+def evaluateAll(pipe, target_names, rambam_test_set, parser, output="evaluation", processes=1):
+    jobs = [(source, None) for source in TEST_SOURCES]
+    if parser.train_ratio < 1:
+        jobs.insert(0, ("rambam", rambam_test_set))
+
+    print(f"\nEvaluating {len(jobs)} test sources.")
+    if processes == 1:
+        initWorker(pipe, target_names, parser)
+        results = dict(evaluateSource(*job) for job in jobs)
+    else:
+        with Pool(processes or None, initWorker, (pipe, target_names, parser)) as pool:
+            results = dict(pool.starmap(evaluateSource, jobs))
+
+    # Keep the order of the sources.
+    results = {source: results[source] for source, _ in jobs}
+    with open(f"{output}.json", 'w', encoding="utf8") as file:
+        json.dump(results, file, ensure_ascii=False, indent=1, default=lambda value: value.item())
+
+    columns = ["segments", "accuracy", "macro_f1", "weighted_f1"]
+    with open(f"{output}.csv", 'w', encoding="utf8", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(["source"] + columns)
+        for source, result in results.items():
+            writer.writerow([source] + [round(result[column], 2) for column in columns])
+
+    print(f"\n{'source':<8} {'segments':>8} {'accuracy':>9} {'macro f1':>9} {'weighted f1':>12}")
+    for source, result in results.items():
+        print(f"{source:<8} {result['segments']:>8} {result['accuracy']:>8.2f}% "
+              f"{result['macro_f1']:>8.2f}% {result['weighted_f1']:>11.2f}%")
+    print(f"\nThe results were saved to '{output}.json' and '{output}.csv'.")
+
+    return results
@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+from multiprocessing import Pool
+from collections import defaultdict
+from random import Random
+from . import svm_classification as sc
+from . import data_handler as dh
+from . import dataset_extractor as de
+from . import instrumentation as it
+import numpy as np
+import json
+import sys
+
+# The Rambam data set of the process (or worker process), the label to segments.
+WORKER_STATE = {}
+
+
+def initWorker(data_set):
+    WORKER_STATE["data_set"] = data_set
+
+
+# The function return the train and test sets (defaultdict(list)) of a split of the data
+#   set. A split is ("split", seed, ratio) for a shuffled train-test split by the ratio, or
+#   ("fold", seed, k, i) for the i fold of k stratified folds (each label is divided
+#   between the folds). The shuffle of each split is seeded so the split is reproducible,
+#   and the sets are built in memory so the splits don't share any file.
+def buildSplit(data_set, split):
+    train_set, test_set = defaultdict(list), defaultdict(list)
+    random = Random(split[1])
+    for label in sorted(data_set):
+        segments = list(data_set[label])
+        random.shuffle(segments)
+
+        if split[0] == "split":
+            train, test = dh.ratioBasedSorter(split[2])(segments)
+        else:
+            k, i = split[2:]
+            train = [segment for j, segment in enumerate(segments) if j % k != i]
+            test = segments[i::k]
+
+        train_set[label].extend(train)
+        test_set[label].extend(test)
+
+    return train_set, test_set
+
+
+# The function fit the recommended pipe on the train set of the split and return the split,
+#   the accuracy on its test set and the accuracy of each label (None if the label isn't
+#   in the test set).
+def runSplit(split):
+    train_set, test_set = buildSplit(WORKER_STATE["data_set"], split)
+    with it.stage("experiment_split", split=list(split)):
+        pipe = sc.fitPipe(train_set)
+        test_set = sc.load_set(test_set, "Test")
+        predicted = sc.predictSteps(pipe, test_set)
+
+    correct = predicted == test_set.target
+    label_accuracy = {label: 100 * float(np.mean(correct[test_set.target == i]))
+                      if np.any(test_set.target == i) else None
+                      for i, label in enumerate(test_set.target_names)}
+    return split, 100 * float(np.mean(correct)), label_accuracy
+
+
+# The function extract the Rambam data once and run the experiment on it: with folds (k) the
+#   pipe is fitted and tested on each of k stratified folds, otherwise on splits (N) seeded
+#   train-test splits by the train ratio. The splits are run in parallel and the mean and
+#   standard deviation of the accuracy and of the accuracy of each label are printed and
+#   saved to '<output>.json' with the results of each split.
+#   NOTE: putting 0 processes will use all the cores.
+def runExperiment(parser, splits=5, folds=0, seed=0, output="experiment", processes=1):
+    if (folds == 1) or (not folds and parser.train_ratio == 1.):
+        print("The experiment need at least 2 folds or a train ratio below 1 to have a test set.")
+        sys.exit(0)
+
+    path = f"{parser.train_path}/{dh.RAMBAM_PATH}"
+    with it.stage("extract_rambam") as counts:
+        data_set = de.rambam_extractor(path, parser.processes, parser.cache_path)
+        counts.update(documents=sum(len(segments) for segments in data_set.values()),
+                      labels=len(data_set))
+
+    if folds:
+        jobs = [("fold", seed, folds, i) for i in range(folds)]
+    else:
+        jobs = [("split", seed + i, parser.train_ratio) for i in range(splits)]
+
+    print(f"\nRunning {len(jobs)} {'folds' if folds else 'splits'} of the Rambam set.")
+    if processes == 1:
+        initWorker(data_set)
+        results = [runSplit(job) for job in jobs]
+    else:
+        with Pool(processes or None, initWorker, (data_set,)) as pool:
+            results = pool.map(runSplit, jobs)
+
+    accuracies = np.array([accuracy for _, accuracy, _ in results])
+    labels = {}
+    for label in sorted(data_set):
+        values = np.array([result[label] for _, _, result in results if result[label] is not None])
+        labels[label] = {"mean": float(values.mean()) if len(values) else None,
+                         "std": float(values.std()) if len(values) else None, "splits": len(values)}
+
+    summary = {
+        "splits": [{"split": list(split), "accuracy": accuracy, "labels": label_accuracy}
+                   for split, accuracy, label_accuracy in results],
+        "accuracy": {"mean": float(accuracies.mean()), "std": float(accuracies.std())},
+        "labels": labels,
+    }
+    with open(f"{output}.json", 'w', encoding="utf8") as file:
+        json.dump(summary, file, ensure_ascii=False, indent=1)
+
+    print(f"\n{'label':<30} {'mean':>7} {'std':>6}")
+    for label, values in labels.items():
+        if values["mean"] is not None:
+            print(f"{label:<30} {values['mean']:>6.2f}% {values['std']:>6.2f}")
+    print(f"\nAccuracy: {accuracies.mean():.2f}% (std {accuracies.std():.2f}) over {len(jobs)} "
+          f"{'folds' if folds else 'splits'}.")
+    print(f"The results were saved to '{output}.json'.")
+
+    return summary
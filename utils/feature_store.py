@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+from sklearn.pipeline import Pipeline
+from . import instrumentation as it
+from scipy import sparse
+import hashlib
+import pickle
+import os
+
+# The feature store save the fitted vectorizer and the TF-IDF matrices of the sets so runs
+#   and experiments on the same sets reuse them instead of vectorizing the text again.
+#   Each entry is keyed on the fingerprint of the set and the parameters of the vectorizer:
+#   '<key>.vect.pickle' - the fitted vectorizer.
+#   '<key>.npz' - the CSR matrix of the set.
+
+
+# The function return a fingerprint of a set (as returned by 'load_set') that change
+#   with any change of the data, the labels or their order.
+def setFingerprint(data_set):
+    fingerprint = hashlib.sha1()
+    fingerprint.update("\0".join(data_set.target_names).encode("utf-8"))
+    fingerprint.update(data_set.target.astype("int64").tobytes())
+    for segment in data_set.data:
+        fingerprint.update(b"\0" + segment.encode("utf-8"))
+
+    return fingerprint.hexdigest()
+
+
+# The function return the key of a parameter of a vectorizer. The functions (like a
+#   preprocessor) are keyed on their name and other callable objects (like the Hebrew
+#   tokenizer) on their pickled content, since they can be fitted.
+def paramKey(value):
+    if hasattr(value, "__qualname__"):
+        return f"{value.__module__}.{value.__qualname__}"
+    if callable(value):
+        return hashlib.sha1(pickle.dumps(value)).hexdigest()
+
+    return value
+
+
+# The function return the key of a vectorizer fitted on a set (see 'paramKey').
+def vectorizerKey(vectorizer, data_set):
+    params = sorted((name, paramKey(value)) for name, value in vectorizer.get_params().items())
+    return hashlib.sha1(f"{params}|{setFingerprint(data_set)}".encode("utf-8")).hexdigest()
+
+
+# The function write a file with the save function (that take an open file) through a
+#   temporary file so parallel runs never read a partial file.
+def atomicSave(path, save):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "wb") as file:
+        save(file)
+    os.replace(temp_path, path)
+
+
+# The function take an unfitted vectorizer and a train set and return the fitted vectorizer
+#   and the matrix of the train set. If they were already saved in the store they are
+#   loaded, otherwise the vectorizer is fitted and saved.
+def fitTransform(store_path, vectorizer, train_set):
+    key = vectorizerKey(vectorizer, train_set)
+    vectorizer_path = os.path.join(store_path, f"{key}.vect.pickle")
+    matrix_path = os.path.join(store_path, f"{key}.npz")
+
+    if os.path.isfile(vectorizer_path) and os.path.isfile(matrix_path):
+        print("Loading the train features from the feature store.")
+        with it.stage("vectorize", stored=True) as counts:
+            with open(vectorizer_path, "rb") as file:
+                vectorizer = pickle.load(file)
+            features = sparse.load_npz(matrix_path)
+            counts.update(documents=features.shape[0], features=features.shape[1])
+        return vectorizer, features
+
+    print("Vectorizing the train set.")
+    with it.stage("vectorize", stored=False) as counts:
+        features = vectorizer.fit_transform(train_set.data)
+        counts.update(documents=features.shape[0], features=features.shape[1])
+
+    # The stop words are only needed for fitting and can be large.
+    vectorizer.stop_words_ = None
+    vectorizer.feature_store_key_ = key
+
+    atomicSave(matrix_path, lambda file: sparse.save_npz(file, features.tocsr()))
+    atomicSave(vectorizer_path, lambda file: pickle.dump(vectorizer, file))
+    return vectorizer, features
+
+
+# The function take a fitted vectorizer and a set and return the matrix of the set, from
+#   the store if it was already saved there.
+def transform(store_path, vectorizer, data_set):
+    # A vectorizer that didn't came from the store is keyed on its pickled content.
+    key = getattr(vectorizer, "feature_store_key_", None)
+    if key is None:
+        key = hashlib.sha1(pickle.dumps(vectorizer)).hexdigest()
+
+    key = hashlib.sha1(f"{key}|{setFingerprint(data_set)}".encode("utf-8")).hexdigest()
+    matrix_path = os.path.join(store_path, f"{key}.npz")
+
+    if os.path.isfile(matrix_path):
+        print("Loading the features from the feature store.")
+        with it.stage("vectorize", stored=True) as counts:
+            features = sparse.load_npz(matrix_path)
+            counts.update(documents=features.shape[0], features=features.shape[1])
+        return features
+
+    with it.stage("vectorize", stored=False) as counts:
+        features = vectorizer.transform(data_set.data)
+        counts.update(documents=features.shape[0], features=features.shape[1])
+    atomicSave(matrix_path, lambda file: sparse.save_npz(file, features.tocsr()))
+    return features
+
+
+# The function fit an unfitted pipe (that start with the vectorizer) on the train set
+#   using the store for the vectorizer and the train matrix. The rest of the pipe is
+#   fitted on the matrix.
+def fitPipe(store_path, pipe, train_set):
+    name, vectorizer = pipe.steps[0]
+    vectorizer, features = fitTransform(store_path, vectorizer, train_set)
+    pipe.steps[0] = (name, vectorizer)
+
+    print("Fitting the pipe.")
+    with it.stage("train", labels=len(train_set.target_names)):
+        Pipeline(pipe.steps[1:]).fit(features, train_set.target)
+    return pipe
+
+
+# The function predict the set with a fitted pipe using the store for the matrix of the set.
+def predict(store_path, pipe, data_set):
+    features = transform(store_path, pipe.steps[0][1], data_set)
+    with it.stage("predict", documents=features.shape[0]):
+        return Pipeline(pipe.steps[1:]).predict(features)
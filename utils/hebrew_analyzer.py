@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+from collections import Counter
+from functools import lru_cache
+import re
+
+# The Hebrew tokenizer of the vectorizer (see 'HebrewTokenizer'). A token is a word that may
+#   hold gershayim or a geresh ('רמב"ם', 'ה'') so the quote marks don't split it, and it is
+#   normalized (see 'normalizeToken') so the forms of a word are a single feature.
+TOKEN_PATTERN = re.compile(r"\w+(?:[\"'״׳]\w+)*['׳]?")
+
+# The final letters and their regular form.
+FINAL_LETTERS = str.maketrans("ךםןףץ", "כמנפצ")
+
+# The one letter prefixes (ו, ה, ב, ל, מ, ש, כ) that may be stripped, at most MAX_PREFIXES
+#   of them and only while at least MIN_STEM letters are left.
+PREFIXES = "והבלמשכ"
+MAX_PREFIXES = 2
+MIN_STEM = 2
+
+# The number of normalized tokens that are kept. The vocabulary of the corpus repeat so
+#   after the first texts almost every token is already normalized.
+NORMALIZE_CACHE = 2 ** 18
+
+
+# The function normalize the spelling of a token: the gershayim inside the word are deleted
+#   ('רמב"ם' is 'רמבם'), a geresh at the end (an abbreviation or a number) is kept as "'"
+#   and the final letters are written as regular letters.
+@lru_cache(maxsize=NORMALIZE_CACHE)
+def normalizeToken(token):
+    abbreviation = token[-1] in "'׳"
+    token = token.rstrip("'׳").replace('"', '').replace('״', '').replace("'", '').replace('׳', '')
+    token = token.translate(FINAL_LETTERS)
+    return token + "'" if abbreviation else token
+
+
+# The class is the tokenizer of the vectorizer ('TfidfVectorizer(tokenizer=HebrewTokenizer())').
+#   It is fitted on the train texts (see 'fit') to count their normalized words, and the
+#   prefixes are stripped only when the word without them is more common in the texts than
+#   the word itself, so 'בשבת' is 'שבת' but 'שמירה' isn't 'מירה' and 'שבת' isn't 'בת'.
+#   The tokens are the normalized words that have at least two letters (like the default
+#   token pattern of the vectorizer) and the n-grams are made of them.
+class HebrewTokenizer:
+    def __init__(self, counts=None):
+        self.counts = counts or {}
+        self.stems = {}
+
+    # Only the counts are kept (the stems are found again after loading).
+    def __getstate__(self):
+        return {"counts": self.counts}
+
+    def __setstate__(self, state):
+        self.__init__(state["counts"])
+
+    # The function count the normalized words of the texts and return the tokenizer.
+    def fit(self, texts):
+        counts = Counter()
+        for text in texts:
+            counts.update(map(normalizeToken, TOKEN_PATTERN.findall(text)))
+
+        self.__init__(dict(counts))
+        return self
+
+    # The function return the word without its prefixes (see the class), the most common of
+    #   the word and the words without its first prefixes.
+    def stem(self, word):
+        if word not in self.stems:
+            stem = word
+            for i in range(1, MAX_PREFIXES + 1):
+                if word[i - 1] not in PREFIXES or len(word) - i < MIN_STEM:
+                    break
+                if self.counts.get(word[i:], 0) > self.counts.get(stem, 0):
+                    stem = word[i:]
+            self.stems[word] = stem
+
+        return self.stems[word]
+
+    def __call__(self, text):
+        tokens = (self.stem(normalizeToken(token)) for token in TOKEN_PATTERN.findall(text))
+        return [token for token in tokens if len(token) > 1]
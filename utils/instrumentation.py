@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+from contextlib import contextmanager
+import json
+import time
+import sys
+import os
+
+try:
+    import resource
+except ImportError: # Not available on Windows, the memory isn't reported.
+    resource = None
+
+# The instrumentation record the stages of a run to a trace file when it is enabled. Each
+#   stage is a JSON line with its name, its start time (seconds since the epoch), its
+#   elapsed seconds, its depth in the stages around it, the peak RSS of the process at its
+#   end and how much the stage raised it (in MB), and the counts the stage added (like the
+#   number of documents or features). When the trace isn't enabled the stages do nothing.
+TRACE = {"file": None, "path": None, "depth": 0}
+
+
+# The function enable the trace and write it to the path (the file is overwritten). The
+#   worker processes enable the trace of the run (TRACE["path"]) with append, so their
+#   stages are added to the same file (each line has the pid of its process).
+def enableTrace(path, append=False):
+    TRACE["file"] = open(path, 'a' if append else 'w', encoding="utf8")
+    TRACE["path"] = path
+
+
+# The function return the peak RSS of the process in MB (None if it can't be measured).
+def peakRss():
+    if resource is None:
+        return None
+
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak_rss / (2 ** 20 if sys.platform == "darwin" else 2 ** 10)
+
+
+# A context of a stage of the run. The context give a dict that the stage can add its
+#   counts to, for example:
+#       with stage("load_files") as counts:
+#           ...
+#           counts["documents"] = len(data)
+@contextmanager
+def stage(name, **counts):
+    if TRACE["file"] is None:
+        yield counts
+        return
+
+    start_peak = peakRss()
+    start_time = time.time()
+    start = time.perf_counter()
+    TRACE["depth"] += 1
+    try:
+        yield counts
+    finally:
+        TRACE["depth"] -= 1
+        record = {"stage": name, "start": start_time, "seconds": time.perf_counter() - start,
+                  "depth": TRACE["depth"], "pid": os.getpid()}
+        if start_peak is not None:
+            record["peak_rss_mb"] = peakRss()
+            record["peak_rss_growth_mb"] = record["peak_rss_mb"] - start_peak
+        record.update(counts)
+
+        TRACE["file"].write(json.dumps(record, ensure_ascii=False) + "\n")
+        TRACE["file"].flush()
+
+
+# The function stream the items of the stream and count them in the counts of a stage.
+def counted(stream, counts, key="documents"):
+    counts[key] = 0
+    for item in stream:
+        counts[key] += 1
+        yield item
@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+from sklearn.feature_extraction.text import CountVectorizer, TfidfVectorizer
+from itertools import chain, repeat
+from scipy import sparse
+import numpy as np
+import re
+
+
+# The function return True if the fitted pipe can be predicted by 'LinearPredictor': a
+#   vocabulary vectorizer (count or TF-IDF) followed by a linear classifier.
+def isLinearPipe(pipe):
+    return (len(pipe.steps) == 2 and isinstance(pipe.steps[0][1], CountVectorizer) and
+            hasattr(pipe.steps[0][1], "vocabulary_") and
+            isinstance(getattr(pipe.steps[1][1], "coef_", None), np.ndarray))
+
+
+# The function return the analyzer of the vectorizer. The plain word analyzer (no custom
+#   preprocessor, stop words or accent stripping) is rebuilt with a single regex pass (or
+#   the tokenizer of the vectorizer, like the Hebrew tokenizer) and the n-grams joined by
+#   zip, otherwise the analyzer of the vectorizer is used.
+def wordAnalyzer(vectorizer):
+    if (vectorizer.analyzer != "word" or vectorizer.input != "content" or
+            vectorizer.preprocessor is not None or
+            vectorizer.stop_words is not None or vectorizer.strip_accents is not None):
+        return vectorizer.build_analyzer()
+
+    tokenize = vectorizer.tokenizer or re.compile(vectorizer.token_pattern).findall
+    lowercase = vectorizer.lowercase
+    min_n, max_n = vectorizer.ngram_range
+
+    def analyze(text):
+        tokens = tokenize(text.lower() if lowercase else text)
+        ngrams = tokens if min_n == 1 else []
+        for n in range(max(min_n, 2), max_n + 1):
+            ngrams = ngrams + [" ".join(gram) for gram in zip(*(tokens[i:] for i in range(n)))]
+        return ngrams
+
+    return analyze
+
+
+# A lightweight predictor of a fitted vectorizer and linear classifier pipe. The texts are
+#   counted by a single vocabulary lookup pass over all their terms into a CSR matrix and
+#   scored by one sparse dot product, without the validation and the intermediate matrices
+#   of the sklearn pipe.
+#   The idf is folded into the weights of the classifier, so for each text only the norm of
+#   its TF-IDF vector is computed. Predict the same labels and scores as the pipe.
+class LinearPredictor:
+    def __init__(self, pipe):
+        vectorizer = pipe.steps[0][1]
+        classifier = pipe.steps[1][1]
+        self.analyzer = wordAnalyzer(vectorizer)
+        self.vocabulary = vectorizer.vocabulary_
+        self.binary = vectorizer.binary
+        self.classes_ = classifier.classes_
+        if hasattr(pipe, "target_names_"):
+            self.target_names_ = pipe.target_names_
+
+        # The TF-IDF settings (a count vectorizer is TF-IDF without idf and norm).
+        tfidf = isinstance(vectorizer, TfidfVectorizer)
+        self.sublinear_tf = tfidf and vectorizer.sublinear_tf
+        self.norm = vectorizer.norm if tfidf else None
+        self.idf = (np.asarray(vectorizer.idf_, dtype=np.float64) if tfidf and vectorizer.use_idf
+                    else np.ones(len(self.vocabulary)))
+
+        # The weights (features x labels) with the idf folded in.
+        self.weights = np.ascontiguousarray(np.asarray(classifier.coef_, dtype=np.float64).T *
+                                            self.idf[:, None])
+        self.intercept = np.asarray(classifier.intercept_, dtype=np.float64)
+
+    # The function return the CSR matrix of the term counts (or the sublinear or binary tf)
+    #   of the texts.
+    def counts(self, texts):
+        terms = [self.analyzer(text) for text in texts]
+        lengths = np.fromiter(map(len, terms), dtype=np.int64, count=len(terms))
+
+        # Look up the columns of all the terms at once, unknown terms are -1.
+        columns = np.fromiter(map(self.vocabulary.get, chain.from_iterable(terms), repeat(-1)),
+                              dtype=np.int64, count=int(lengths.sum()))
+        known = columns >= 0
+        known_count = np.concatenate(([0], np.cumsum(known)))
+        indptr = known_count[np.concatenate(([0], np.cumsum(lengths)))]
+
+        matrix = sparse.csr_matrix((np.ones(int(indptr[-1])), columns[known], indptr),
+                                   shape=(len(texts), len(self.vocabulary)))
+        matrix.sum_duplicates()
+
+        if self.binary:
+            matrix.data[:] = 1
+        elif self.sublinear_tf:
+            np.log(matrix.data, out=matrix.data)
+            matrix.data += 1
+
+        return matrix
+
+    # The function return the decision scores of the texts (like the pipe).
+    def decision_function(self, texts):
+        matrix = self.counts(texts)
+        scores = matrix @ self.weights
+
+        # Divide each row by the norm of its TF-IDF vector.
+        if self.norm is not None:
+            values = matrix.data * self.idf[matrix.indices]
+            values = np.abs(values) if self.norm == "l1" else values * values
+            norms = np.zeros(len(texts))
+            rows = np.flatnonzero(np.diff(matrix.indptr))
+            norms[rows] = np.add.reduceat(values, matrix.indptr[rows]) if len(values) else 0
+            if self.norm == "l2":
+                np.sqrt(norms, out=norms)
+            norms[norms == 0] = 1
+            scores /= norms[:, None]
+
+        scores += self.intercept
+        return scores.ravel() if scores.shape[1] == 1 else scores
+
+    # The function return the predicted labels of the texts (like the pipe).
+    def predict(self, texts):
+        scores = self.decision_function(texts)
+        if scores.ndim == 1:
+            return self.classes_[(scores > 0).astype(int)]
+
+        return self.classes_[scores.argmax(axis=1)]
@@ -0,0 +1,153 @@
+#!/usr/bin/env python
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.pipeline import Pipeline
+from sklearn.svm import LinearSVC
+from . import hebrew_analyzer as ha
+from argparse import ArgumentParser
+import numpy as np
+import pickle
+import json
+import sys
+import os
+
+# The model artifact is a folder that hold a fitted TF-IDF and linear classifier pipe
+#   without pickle, so it is small and fast to load:
+#   'manifest.json' - the format version, the vectorizer parameters (and its tokenizer, see
+#   'TOKENIZERS') and the labels.
+#   'word_counts.json' - the word counts the tokenizer was fitted on (when it has one).
+#   'vocabulary.txt' - the terms of the vectorizer, one for each line by their column.
+#   'idf.npy' - the idf vector of the vectorizer (when it use idf).
+#   'coef.npy' and 'intercept.npy' - the weights of the classifier (the coef is kept as
+#   float32, which halve the artifact and change the scores only by rounding).
+#   The arrays are memory mapped when the artifact is loaded.
+ARTIFACT_VERSION = 3
+
+# The vectorizer parameters that are kept in the manifest.
+VECTORIZER_PARAMS = ("analyzer", "binary", "encoding", "decode_error", "lowercase", "max_df",
+                     "min_df", "ngram_range", "norm", "smooth_idf", "strip_accents",
+                     "sublinear_tf", "token_pattern", "use_idf")
+
+# The tokenizers a vectorizer can have, kept by the name of their class in the manifest.
+TOKENIZERS = {"hebrew": ha.HebrewTokenizer}
+
+
+# The function export a fitted pipe of a vectorizer and a linear classifier to the folder and
+#   return True. Other pipes (or a vectorizer with stop words) can't be loaded from the
+#   artifact, so the export is skipped with a warning and False is returned.
+def exportPipe(pipe, path):
+    vectorizer = pipe.steps[0][1]
+    classifier = pipe.steps[-1][1]
+    params = vectorizer.get_params()
+    tokenizers = {tokenizer: name for name, tokenizer in TOKENIZERS.items()}
+    if (len(pipe.steps) != 2 or not isinstance(vectorizer, TfidfVectorizer) or
+            any(callable(params[name]) for name in VECTORIZER_PARAMS) or
+            params["preprocessor"] is not None or params["stop_words"] is not None or
+            (params["tokenizer"] is not None and type(params["tokenizer"]) not in tokenizers) or
+            not isinstance(getattr(classifier, "coef_", None), np.ndarray)):
+        print("Only pipes of a TF-IDF vectorizer (without stop words) and a linear classifier can be "
+              "exported, the pipe wasn't exported.")
+        return False
+
+    print(f"Exporting the pipe to '{path}'.")
+    os.makedirs(path, exist_ok=True)
+
+    terms = sorted(vectorizer.vocabulary_, key=vectorizer.vocabulary_.get)
+    with open(os.path.join(path, "vocabulary.txt"), 'w', encoding="utf8", newline="\n") as file:
+        file.write("\n".join(terms))
+    if vectorizer.use_idf:
+        np.save(os.path.join(path, "idf.npy"), vectorizer.idf_)
+    np.save(os.path.join(path, "coef.npy"), np.ascontiguousarray(classifier.coef_, dtype=np.float32))
+    np.save(os.path.join(path, "intercept.npy"), np.asarray(classifier.intercept_))
+
+    target_names = getattr(pipe, "target_names_", None)
+    manifest = {
+        "version": ARTIFACT_VERSION,
+        "vectorizer": {name: params[name] for name in VECTORIZER_PARAMS},
+        "tokenizer": tokenizers.get(type(params["tokenizer"])),
+        "dtype": np.dtype(vectorizer.dtype).name,
+        "classes": classifier.classes_.tolist(),
+        "target_names": list(target_names) if target_names is not None else None,
+        "features": len(terms),
+    }
+    if params["tokenizer"] is not None:
+        with open(os.path.join(path, "word_counts.json"), 'w', encoding="utf8") as file:
+            json.dump(params["tokenizer"].counts, file, ensure_ascii=False)
+    with open(os.path.join(path, "manifest.json"), 'w', encoding="utf8") as file:
+        json.dump(manifest, file, ensure_ascii=False, indent=1)
+
+    return True
+
+
+# The function load the manifest of the artifact in the folder.
+def loadManifest(path):
+    with open(os.path.join(path, "manifest.json"), 'r', encoding="utf8") as file:
+        manifest = json.load(file)
+
+    # The first version is the same without a tokenizer and the second without the word
+    #   counts of the tokenizer (its tokenizer can't be loaded).
+    if (manifest["version"] not in (1, 2, ARTIFACT_VERSION) or
+            (manifest["version"] == 2 and manifest.get("tokenizer"))):
+        print(f"Artifact version {manifest['version']} isn't supported.")
+        sys.exit(0)
+
+    return manifest
+
+
+# The function load the terms of the artifact in the folder.
+def loadVocabulary(path):
+    with open(os.path.join(path, "vocabulary.txt"), 'r', encoding="utf8", newline="\n") as file:
+        return file.read().split("\n")
+
+
+# The function load the tokenizer of the name (see 'TOKENIZERS') fitted on the word counts of
+#   the artifact in the folder.
+def loadTokenizer(path, name):
+    with open(os.path.join(path, "word_counts.json"), 'r', encoding="utf8") as file:
+        return TOKENIZERS[name](json.load(file))
+
+
+# The function load an artifact folder as a fitted pipe that predict like the exported one.
+def loadArtifact(path):
+    manifest = loadManifest(path)
+    params = manifest["vectorizer"]
+    params["ngram_range"] = tuple(params["ngram_range"])
+
+    terms = loadVocabulary(path)
+    tokenizer = manifest.get("tokenizer")
+    vectorizer = TfidfVectorizer(vocabulary={term: i for i, term in enumerate(terms)},
+                                 tokenizer=loadTokenizer(path, tokenizer) if tokenizer else None,
+                                 dtype=np.dtype(manifest["dtype"]), **params)
+    # The vocabulary is given, so the vectorizer only need the saved idf (or without idf to
+    #   be fitted on any text, it learn nothing from it).
+    if vectorizer.use_idf:
+        vectorizer.idf_ = np.load(os.path.join(path, "idf.npy"), mmap_mode='r')
+    else:
+        vectorizer.fit([""])
+
+    classifier = LinearSVC()
+    classifier.coef_ = np.load(os.path.join(path, "coef.npy"), mmap_mode='r')
+    classifier.intercept_ = np.load(os.path.join(path, "intercept.npy"))
+    classifier.classes_ = np.array(manifest["classes"])
+
+    pipe = Pipeline([('vect', vectorizer), ('clf', classifier)])
+    if manifest["target_names"] is not None:
+        pipe.target_names_ = manifest["target_names"]
+
+    return pipe
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description="Rambam classifier model artifact export")
+    parser.add_argument("--pipe_path",
+                        type=str,
+                        default="pipe.pickle",
+                        help="Set the path to the pickled pipe to export.")
+    parser.add_argument("--artifact_path",
+                        type=str,
+                        default="./pipe_artifact/",
+                        help="Set the folder the artifact is exported to.")
+
+    # Export the pipe with the parameters
+    parser = parser.parse_args()
+    with open(parser.pipe_path, "rb") as file:
+        exportPipe(pickle.load(file), parser.artifact_path)
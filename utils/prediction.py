@@ -0,0 +1,164 @@
+#!/usr/bin/env python
+from multiprocessing import Pool
+from collections import deque
+from functools import partial
+from . import dataset_extractor as de
+from . import model_artifact as ma
+from . import linear_predictor as lp
+from . import instrumentation as it
+import numpy as np
+import pickle
+import json
+import glob
+import sys
+import os
+
+# The normalizers that can clean raw text for a pipe, by the source the text look like.
+#   The pipes are trained on the Rambam so its normalizer is the default.
+NORMALIZERS = {
+    "rambam": de.RAMBAM_NORMALIZER,
+    "noda_biyhudah": de.NODA_BIYHUDAH_NORMALIZER,
+    "default": de.NORMALIZER,
+}
+
+
+# The function clean raw text the same way the extractors clean the segments: normalize
+#   the text and join its words with single spaces.
+def cleanText(text, normalizer=de.RAMBAM_NORMALIZER):
+    return ' '.join(normalizer(text).split())
+
+
+# The function return the fastest predictor of the fitted pipe: the 'LinearPredictor' of
+#   linear pipes (that predict the same) or the pipe itself.
+def fastPipe(pipe):
+    return lp.LinearPredictor(pipe) if lp.isLinearPipe(pipe) else pipe
+
+
+# The function return the label names of the pipe. Pipes fitted by 'svm_classification'
+#   keep the label names of their train set, for older pipes the label numbers are used.
+def labelNames(pipe):
+    target_names = getattr(pipe, "target_names_", None)
+    if target_names is None:
+        return [str(label) for label in pipe.classes_]
+
+    return [target_names[label] for label in pipe.classes_]
+
+
+# The function take a fitted pipe and cleaned texts and return the predicted label index
+#   (in 'labelNames') and the decision scores of all the labels for each text.
+def predictScores(pipe, texts):
+    scores = pipe.decision_function(texts)
+
+    # Two labels have a single score for the second label.
+    if scores.ndim == 1:
+        scores = np.column_stack([-scores, scores])
+
+    return scores.argmax(axis=1), scores
+
+
+# The function return the top_k labels and their scores for each text as lists of
+#   [label, score] (the best first).
+def topLabels(pipe, texts, top_k=3):
+    label_names = labelNames(pipe)
+    _, scores = predictScores(pipe, texts)
+    top = np.argsort(-scores, axis=1, kind="mergesort")[:, :top_k]
+    return [[[label_names[label], round(float(score[label]), 6)] for label in labels]
+            for labels, score in zip(top, scores)]
+
+
+# The function stream (id, text) pairs of the raw texts in path. The path can be a folder
+#   of text files (each file is a text and its id is its path in the folder) or a JSONL
+#   file with a "text" on each line (the id is the "id" of the line or its number).
+def readTexts(path):
+    if os.path.isdir(path):
+        for file in sorted(glob.glob(os.path.join(path, "**", "*.txt"), recursive=True)):
+            with open(file, 'r', encoding="utf8", errors="ignore") as text:
+                yield os.path.relpath(file, path), text.read()
+        return
+
+    with open(path, 'r', encoding="utf8") as file:
+        for i, line in enumerate(file):
+            if line.strip():
+                line = json.loads(line)
+                yield line.get("id", i), line["text"]
+
+
+# The function split a stream to lists of size items (the last can be smaller).
+def chunked(stream, size):
+    chunk = []
+    for item in stream:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+
+    if chunk:
+        yield chunk
+
+
+# The function predict a chunk of (id, text) pairs with the loaded pipe (see
+#   'loadWorkerPipe') and return the JSONL lines of the predictions.
+def predictChunk(chunk, top_k=3, normalizer="rambam"):
+    with it.stage("predict_chunk", documents=len(chunk)):
+        top = topLabels(WORKER_PIPE, [cleanText(text, NORMALIZERS[normalizer]) for _, text in chunk], top_k)
+        return [json.dumps({"id": text_id, "label": labels[0][0], "top": labels}, ensure_ascii=False)
+                for (text_id, _), labels in zip(chunk, top)]
+
+
+# The pipe of the process (or worker process) of 'predictTexts'.
+WORKER_PIPE = None
+
+
+# The function load the pipe of the process from a pickle or an artifact folder. A worker
+#   process also add its stages to the trace in trace_path (if the trace is enabled).
+def loadWorkerPipe(pipe_path, trace_path=None):
+    global WORKER_PIPE
+    if trace_path:
+        it.enableTrace(trace_path, append=True)
+
+    if os.path.isdir(pipe_path):
+        WORKER_PIPE = fastPipe(ma.loadArtifact(pipe_path))
+        return
+
+    with open(pipe_path, "rb") as file:
+        WORKER_PIPE = fastPipe(pickle.load(file))
+
+
+# The function stream the raw texts in path (see 'readTexts') through the pipe in chunks of
+#   chunk_size texts and write the top_k labels of each text to the output JSONL file.
+#   With more than one process the chunks are predicted by worker processes that each load
+#   the pipe from pipe_path. Only a few chunks are read ahead of the writing so the memory
+#   doesn't grow with the input. NOTE: putting 0 processes will use all the cores.
+def predictTexts(path, pipe_path, output, top_k=3, chunk_size=256, processes=1,
+                 normalizer="rambam"):
+    if not os.path.exists(pipe_path):
+        print(f"file missing. Please check the pipe path '{pipe_path}'.")
+        sys.exit(0)
+
+    chunks = chunked(readTexts(path), chunk_size)
+    count = 0
+    with open(output, 'w', encoding="utf8") as file:
+        if processes == 1:
+            loadWorkerPipe(pipe_path)
+            for chunk in chunks:
+                file.write("\n".join(predictChunk(chunk, top_k, normalizer)) + "\n")
+                count += len(chunk)
+        else:
+            processes = processes or os.cpu_count()
+            with Pool(processes, loadWorkerPipe, (pipe_path, it.TRACE["path"])) as pool:
+                window = deque()
+                predict = partial(predictChunk, top_k=top_k, normalizer=normalizer)
+                for chunk in chunks:
+                    window.append(pool.apply_async(predict, (chunk,)))
+                    # Keep two chunks for each process in work.
+                    while len(window) >= 2 * processes:
+                        lines = window.popleft().get()
+                        file.write("\n".join(lines) + "\n")
+                        count += len(lines)
+
+                while window:
+                    lines = window.popleft().get()
+                    file.write("\n".join(lines) + "\n")
+                    count += len(lines)
+
+    print(f"Predicted {count} texts to '{output}'.")
@@ -0,0 +1,180 @@
+#!/usr/bin/env python
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from argparse import ArgumentParser
+from threading import Thread, Event
+from . import svm_classification as sc
+from . import prediction as pr
+import queue
+import json
+import time
+
+# The prediction server load a pipe once and classify raw texts over HTTP:
+#   POST /predict with {"text": "..."} or {"texts": ["...", ...]} return for each text
+#   {"label": <predicted label>, "scores": {<label>: <decision score>, ...}}
+#   ("texts" return a list of them). GET /health return {"status": "ok"}.
+#   The texts of concurrent requests are predicted together in micro batches.
+
+
+# The function start a thread that predict the queued texts in batches and return a
+#   function that take cleaned texts and return their predictions (or raise RuntimeError
+#   if their batch failed). A batch wait up to max_wait seconds after its first text for
+#   more texts, until it has max_batch texts.
+def batchPredictor(pipe, max_batch=64, max_wait=0.005):
+    label_names = pr.labelNames(pipe)
+    requests = queue.Queue()
+
+    def worker():
+        while True:
+            # Wait for the first request and collect more until the batch is full or the
+            #   wait is over.
+            batch = [requests.get()]
+            size = len(batch[0][0])
+            deadline = time.perf_counter() + max_wait
+            while size < max_batch:
+                try:
+                    batch.append(requests.get(timeout=max(deadline - time.perf_counter(), 0)))
+                except queue.Empty:
+                    break
+                size += len(batch[-1][0])
+
+            texts = [text for request_texts, _ in batch for text in request_texts]
+            results, error = None, None
+            try:
+                labels, scores = pr.predictScores(pipe, texts)
+                results = [{"label": label_names[label],
+                            "scores": dict(zip(label_names, score.round(6).tolist()))}
+                           for label, score in zip(labels, scores)]
+            except Exception as e:
+                error = str(e)
+
+            # Hand each request its results (or the error of the batch).
+            start = 0
+            for request_texts, result in batch:
+                result["error"] = error
+                result["predictions"] = results and results[start:start + len(request_texts)]
+                start += len(request_texts)
+                result["done"].set()
+
+    Thread(target=worker, daemon=True).start()
+
+    def predict(texts):
+        result = {"done": Event()}
+        requests.put((texts, result))
+        result["done"].wait()
+        if result["error"] is not None:
+            raise RuntimeError(result["error"])
+        return result["predictions"]
+
+    return predict
+
+
+# The function return the request handler class of the server for the predict function
+#   (see 'batchPredictor') and the normalizer of the raw texts.
+def requestHandler(predict, normalizer):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def send_json(self, code, body):
+            body = json.dumps(body, ensure_ascii=False).encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/health":
+                self.send_json(200, {"status": "ok"})
+            else:
+                self.send_json(404, {"error": "not found"})
+
+        def do_POST(self):
+            if self.path != "/predict":
+                self.send_json(404, {"error": "not found"})
+                return
+
+            try:
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                texts = body["texts"] if "texts" in body else [body["text"]]
+                if not all(isinstance(text, str) for text in texts):
+                    raise ValueError
+            except Exception:
+                self.send_json(400, {"error": "expected json with 'text' or 'texts'"})
+                return
+
+            try:
+                predictions = predict([pr.cleanText(text, normalizer) for text in texts]) if texts else []
+            except RuntimeError as e:
+                self.send_json(500, {"error": f"the prediction failed: {e}"})
+                return
+            self.send_json(200, predictions if "texts" in body else predictions[0])
+
+        # Don't print a line for each request.
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+# The function return the server of the request handler on the address. The server handle
+#   each request in a thread and queue up to queue_size connections that wait to be
+#   accepted, so concurrent clients aren't refused.
+def predictionServer(address, handler, queue_size=128):
+    class Server(ThreadingHTTPServer):
+        daemon_threads = True
+        request_queue_size = queue_size
+
+    return Server(address, handler)
+
+
+# The function load the pipe and serve it until stopped.
+def main(parser):
+    pipe = pr.fastPipe(sc.loadPipe(parser.pipe_path))
+    predict = batchPredictor(pipe, parser.max_batch, parser.max_wait / 1000)
+    handler = requestHandler(predict, pr.NORMALIZERS[parser.normalizer])
+
+    server = predictionServer((parser.host, parser.port), handler, parser.queue_size)
+    print(f"Serving the pipe on http://{parser.host}:{parser.port}/predict")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description="Rambam classifier prediction server")
+    parser.add_argument("--pipe_path",
+                        type=str,
+                        default="pipe.pickle",
+                        help="Set the path to the pickled pipe (or the model artifact folder) the server will use.")
+    parser.add_argument("--host",
+                        type=str,
+                        default="127.0.0.1",
+                        help="Set the host the server will listen on.")
+    parser.add_argument("--port",
+                        type=int,
+                        default=8000,
+                        help="Set the port the server will listen on.")
+    parser.add_argument("--max_batch",
+                        type=int,
+                        default=64,
+                        help="Set the most texts that are predicted together.")
+    parser.add_argument("--max_wait",
+                        type=float,
+                        default=5,
+                        help="Set the time in milliseconds a batch wait for more texts.")
+    parser.add_argument("--queue_size",
+                        type=int,
+                        default=128,
+                        help="Set the most connections that wait to be accepted by the server.")
+    parser.add_argument("--normalizer",
+                        type=str,
+                        choices=list(pr.NORMALIZERS),
+                        default="rambam",
+                        help="Set the normalizer of the raw texts by the source they look like.")
+
+    # Run the server with the parameters
+    parser = parser.parse_args()
+    main(parser)
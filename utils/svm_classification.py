@@ -1,153 +1,738 @@
-#!/usr/bin/env python
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.model_selection import GridSearchCV
-from sklearn.svm import LinearSVC,SVC, NuSVC
-from sklearn.datasets import load_files
-from sklearn.pipeline import Pipeline
-from sklearn import metrics
-import numpy as np
-import pickle
-import sys
-
-# lambda function to load sets.
-load_set = lambda path, desc : load_files(path, description=desc, shuffle=False, encoding="utf8",
-                                          decode_error="ignore", random_state=42)
-
-
-# The function fit pipe with optimal setting for the train set.
-def fitPipe(train_set_path):
-    # Load the train set.
-    print("\nLoading the train set files.")
-    train_set = load_set(train_set_path, "Train")
-
-    # Set the pipe.
-    pipe = Pipeline([
-        ('vect', TfidfVectorizer(min_df=3, max_df=0.85, ngram_range=(1, 2), use_idf=True)),
-        ('clf', LinearSVC(C=10, loss='squared_hinge')),
-    ])
-
-    # Fit the pipe.
-    print("Fitting the pipe.")
-    pipe.fit(train_set.data, train_set.target)
-    return pipe
-
-
-# Load a pipe using pickle.
-#   NOTE: the file should be in the main folder named 'pipe.pickle'.
-def loadPipe():
-    try:
-        print("\nLoading the pipe from the pickle file.")
-        return pickle.load(open("pipe.pickle", "rb"))
-    except Exception as e:
-        print("file missing. Please put the file in the main folder or check the name is 'pipe.pickle'.")
-        sys.exit(0)
-
-
-# The function search for the best setting pipe for the train set. The classification can be
-#   "LinearSVC" or "SVC". the function can print all the results if needed and can save the
-#   found pipe.
-def searchFitPipe(train_set_path, classification="LinearSVC", show_results=False, save_pipe=False):
-    print("\nLoading the train set files.")
-    train_set = load_set(train_set_path, "Train")
-
-    # Set the LinearSVC classification search.
-    if classification == "LinearSVC":
-        check_pipe = Pipeline([
-            ('vect', TfidfVectorizer(min_df=3, max_df=0.85)),
-            ('clf', LinearSVC()),
-        ])
-        param = {
-            'vect__ngram_range': [(1, 1), (1, 2)],
-            'vect__use_idf' : [True, False],
-            'clf__C' : [10, 100, 1000],
-            'clf__loss' : ['hinge', 'squared_hinge'],
-        }
-
-    # Set the SVC classification search.
-    elif classification == "SVC":
-        check_pipe = Pipeline([
-            ('vect', TfidfVectorizer(min_df=3, max_df=0.85)),
-            ('clf', SVC()),
-        ])
-        param = {
-            'vect__ngram_range': [(1, 1), (1, 2)],
-            'vect__use_idf' : [True, False],
-            'clf__C' : [10, 100],
-            'clf__kernel' : ['linear', 'poly', 'rbf', 'sigmoid'],
-        }
-
-    else:
-        print("Pipe option not avilable. Please consult the documentation for available methods.")
-        sys.exit(0)
-
-    # Run the Search.
-    print("Start serching best parameters for the pipe.")
-    grid_search = GridSearchCV(check_pipe, param, cv=5, error_score=0, n_jobs=-1,
-                               return_train_score=True, iid=False)
-    grid_search.fit(train_set.data, train_set.target)
-    print("Serching done")
-
-    # Print the Best result and the rest if show_results - True.
-    print(f"\nBest parameters for {classification} are: {grid_search.best_params_}\n")
-
-    if show_results:
-        print("The rest of the search results are:")
-
-        for i in range(len(grid_search.cv_results_['params'])):
-            print(f"{(1 + i):02d}) params: {grid_search.cv_results_['params'][i]}.")
-            line = f"    mean train: {grid_search.cv_results_['mean_train_score'][i]:.2f}, "
-            line += f"std train: {grid_search.cv_results_['std_train_score'][i]:.2f}, "
-            line += f"mean test: {grid_search.cv_results_['mean_test_score'][i]:.2f}, "
-            line += f"std test: {grid_search.cv_results_['std_test_score'][i]:.2f}, "
-            line += f"rank test: {grid_search.cv_results_['rank_test_score'][i]:02d}.\n"
-            print(line)
-
-    # Set the pipe with the best result.
-    if classification == "LinearSVC":
-        pipe = Pipeline([
-            ('vect', TfidfVectorizer(min_df=3,
-                                     max_df=0.85,
-                                     ngram_range=grid_search.best_params_["vect__ngram_range"],
-                                     use_idf=grid_search.best_params_["vect__use_idf"])),
-            ('clf', LinearSVC(C=grid_search.best_params_["clf__C"],
-                              loss=grid_search.best_params_["clf__loss"])),
-        ])
-
-    else: # classification == "SVC"
-        pipe = Pipeline([
-            ('vect', TfidfVectorizer(min_df=3,
-                                     max_df=0.85,
-                                     ngram_range=grid_search.best_params_["vect__ngram_range"],
-                                     use_idf=grid_search.best_params_["vect__use_idf"])),
-            ('clf', SVC(C=grid_search.best_params_["clf__C"],
-                        kernel=grid_search.best_params_["clf__kernel"])),
-        ])
-
-    # Fit the pipe.
-    print("Fitting the pipe.")
-    pipe.fit(train_set.data, train_set.target)
-
-    # Save the pipe.
-    if save_pipe:
-        print("Saveing the pipe as 'pipe.pickle'.")
-        pickle.dump(pipe, open("pipe.pickle", "wb"))
-
-    return pipe
-
-
-# the function take test set path and a pipe and run the pipe on the test set.
-#   If print_report True the function print the classification report of the test set.
-def runTest(test_set_path, pipe, print_report=False):
-    # Load the test set.
-    print("\nLoading the test set files.")
-    test_set = load_set(test_set_path, "Test")
-
-    # Run the pipe on the test set.
-    predicted = pipe.predict(test_set.data)
-    accuracy = 100 * np.mean(predicted == test_set.target)
-    print(f"Test set accuracy: {accuracy:.2f}%")
-
-    # Print the classification report
-    if print_report:
-        print(metrics.classification_report(test_set.target, predicted,
-                                            target_names=test_set.target_names))
+#!/usr/bin/env python
+from sklearn.feature_extraction.text import TfidfVectorizer, HashingVectorizer, TfidfTransformer, CountVectorizer
+from sklearn.feature_selection import SelectKBest, chi2
+from sklearn.linear_model import SGDClassifier
+from sklearn.model_selection import GridSearchCV, ParameterGrid, StratifiedKFold
+from sklearn.svm import LinearSVC,SVC, NuSVC
+from sklearn.datasets import load_files
+from sklearn.pipeline import Pipeline
+from sklearn.base import clone
+from scipy.stats import rankdata
+from sklearn.utils import Bunch
+from sklearn import metrics
+from . import feature_store as fs
+from . import model_artifact as ma
+from . import instrumentation as it
+from . import hebrew_analyzer as ha
+from . import corpus_store as cs
+from tempfile import mkdtemp
+from collections import defaultdict
+from shutil import rmtree
+from scipy import sparse
+import numpy as np
+import pickle
+import json
+import time
+import sys
+import os
+
+# The function load a set. The set can be a path to a folder built by the data handler, an
+#   in-memory set in the form of defaultdict(list) where the keys are the label, a view of
+#   a corpus store (see 'corpus_store', its segments are read when they are used) or a
+#   stream of (label, segment) pairs from the extractors (read in a single pass). All return
+#   the same structure as 'load_files' (the labels are sorted like the folders).
+def load_set(source, desc):
+    with it.stage("load_set", set=desc) as counts:
+        data_set = readSet(source, desc)
+        counts.update(documents=len(data_set.data), labels=len(data_set.target_names))
+
+    return data_set
+
+
+# The function read a set for 'load_set'.
+def readSet(source, desc):
+    if isinstance(source, str):
+        return load_files(source, description=desc, shuffle=False, encoding="utf8",
+                          decode_error="ignore", random_state=42)
+
+    if isinstance(source, cs.SegmentView):
+        return Bunch(data=source, target=source.target(), target_names=source.target_names, DESCR=desc)
+
+    data = []
+    target = []
+    if isinstance(source, dict):
+        target_names = sorted(source)
+        for i, label in enumerate(target_names):
+            data.extend(source[label])
+            target.extend([i] * len(source[label]))
+
+        return Bunch(data=data, target=np.array(target), target_names=target_names, DESCR=desc)
+
+    # Number the labels by their order in the stream and sort them at the end.
+    labels = {}
+    for label, segment in source:
+        data.append(segment)
+        target.append(labels.setdefault(label, len(labels)))
+
+    target_names = sorted(labels)
+    order = np.empty(len(labels), dtype=int)
+    for i, label in enumerate(target_names):
+        order[labels[label]] = i
+
+    return Bunch(data=data, target=order[target], target_names=target_names, DESCR=desc)
+
+
+# The function fit the pipe on the train set like 'pipe.fit': the vectorizer (the first step)
+#   and then the rest of the pipe on the features, each in its own stage.
+def fitSteps(pipe, train_set):
+    with it.stage("vectorize") as counts:
+        features = pipe.steps[0][1].fit_transform(train_set.data)
+        counts.update(documents=features.shape[0], features=features.shape[1])
+
+    with it.stage("train", labels=len(train_set.target_names)):
+        Pipeline(pipe.steps[1:]).fit(features, train_set.target)
+
+    return pipe
+
+
+# The function predict the set with the fitted pipe like 'pipe.predict': the vectorizer
+#   (the first step) and then the rest of the pipe, each in its own stage.
+def predictSteps(pipe, data_set):
+    with it.stage("vectorize") as counts:
+        features = pipe.steps[0][1].transform(data_set.data)
+        counts.update(documents=features.shape[0], features=features.shape[1])
+
+    with it.stage("predict", documents=features.shape[0]):
+        return Pipeline(pipe.steps[1:]).predict(features)
+
+
+# The function return the pipe with the Hebrew tokenizer (see 'hebrew_analyzer') in its
+#   vectorizer if hebrew_analyzer is True, otherwise the pipe is returned as is. The
+#   tokenizer is fitted on the train set with the pipe (see 'fitTokenizer').
+def hebrewPipe(pipe, hebrew_analyzer):
+    if hebrew_analyzer:
+        pipe.set_params(vect__tokenizer=ha.HebrewTokenizer(), vect__token_pattern=None)
+
+    return pipe
+
+
+# The function fit the Hebrew tokenizer of the pipe (if it has one) on the texts of the
+#   train set. It is fitted before the pipe (or the search) since the vectorizer use it.
+def fitTokenizer(pipe, train_set):
+    tokenizer = pipe.steps[0][1].get_params()["tokenizer"]
+    if isinstance(tokenizer, ha.HebrewTokenizer):
+        with it.stage("fit_tokenizer", documents=len(train_set.data)):
+            tokenizer.fit(train_set.data)
+
+
+# The function return the pipe with a feature selection of the select_k (int) terms with the
+#   best chi2 score for the labels. The terms are counted, selected and only then weighted
+#   by TF-IDF (like the vectorizer of the pipe) so the fitted pipe can be pruned (see
+#   'prunePipe'). The pipe is returned as is if select_k is 0.
+def selectPipe(pipe, select_k):
+    if not select_k:
+        return pipe
+
+    vect_params = pipe.steps[0][1].get_params()
+    tfidf_params = {name: vect_params.pop(name) for name in ("norm", "use_idf", "smooth_idf", "sublinear_tf")}
+    return Pipeline([
+        ('vect', CountVectorizer(**vect_params)),
+        ('select', SelectKBest(chi2, k=select_k)),
+        ('tfidf', TfidfTransformer(**tfidf_params)),
+    ] + pipe.steps[1:])
+
+
+# The function take a fitted pipe with a feature selection (see 'selectPipe') and return the
+#   same pipe as a TF-IDF vectorizer of only the selected terms and the classifier. The
+#   pruned pipe predict the same, but its vocabulary is only the selected terms.
+def prunePipe(pipe):
+    if 'select' not in pipe.named_steps:
+        return pipe
+
+    count, select, tfidf = pipe.named_steps['vect'], pipe.named_steps['select'], pipe.named_steps['tfidf']
+    terms = sorted(count.vocabulary_, key=count.vocabulary_.get)
+    vocabulary = {terms[i]: j for j, i in enumerate(select.get_support(indices=True))}
+
+    params = count.get_params()
+    params.update(vocabulary=vocabulary, **tfidf.get_params())
+    vectorizer = TfidfVectorizer(**params)
+    # The vocabulary is given, so the vectorizer only need the idf of the fitted terms (or
+    #   without idf to be fitted on any text, it learn nothing from it).
+    if vectorizer.use_idf:
+        vectorizer.idf_ = tfidf.idf_
+    else:
+        vectorizer.fit([""])
+
+    pruned = Pipeline([('vect', vectorizer), ('clf', pipe.steps[-1][1])])
+    if hasattr(pipe, "target_names_"):
+        pruned.target_names_ = pipe.target_names_
+    print(f"Pruned the vocabulary from {len(terms)} to {len(vocabulary)} terms.")
+    return pruned
+
+
+# The function print the number of features of the fitted pipe and its pickled size.
+def printPipeSize(pipe):
+    vectorizer = pipe.steps[0][1]
+    features = len(vectorizer.vocabulary_) if hasattr(vectorizer, "vocabulary_") else vectorizer.n_features
+    print(f"The pipe has {features} features and its pickle is {len(pickle.dumps(pipe)) / 2 ** 20:.1f} MB.")
+
+
+# The function fit pipe with optimal setting for the train set.
+#   NOTE: the train set can be a path or an in-memory set (see 'load_set').
+#   If feature_store is given the vectorizer and train matrix are reused from the feature
+#   store (see 'feature_store'). If select_k is given only the select_k best terms are kept
+#   (see 'selectPipe') and if hebrew_analyzer is True the text is tokenized by the Hebrew
+#   tokenizer (see 'hebrewPipe').
+def fitPipe(train_set_path, feature_store="", select_k=0, hebrew_analyzer=False):
+    # Load the train set.
+    print("\nLoading the train set files.")
+    train_set = load_set(train_set_path, "Train")
+
+    # Set the pipe.
+    pipe = selectPipe(hebrewPipe(Pipeline([
+        ('vect', TfidfVectorizer(min_df=3, max_df=0.85, ngram_range=(1, 2), use_idf=True)),
+        ('clf', LinearSVC(C=10, loss='squared_hinge')),
+    ]), hebrew_analyzer), select_k)
+
+    # Fit the pipe and keep the label names for predicting new texts.
+    start = time.perf_counter()
+    fitTokenizer(pipe, train_set)
+    if feature_store:
+        fs.fitPipe(feature_store, pipe, train_set)
+    else:
+        print("Fitting the pipe.")
+        fitSteps(pipe, train_set)
+    print(f"Fitted the pipe in {time.perf_counter() - start:.1f} seconds.")
+
+    pipe.target_names_ = train_set.target_names
+    return prunePipe(pipe)
+
+
+# The number of hashed features of the online pipe.
+HASH_FEATURES = 2 ** 17
+
+# The number of segments of each label the online pipe keep (a uniform sample) to replay
+#   when it is updated (see 'updatePipe').
+REPLAY_SIZE = 100
+
+
+# The function return the label names of a set (a path to a folder built by the data handler,
+#   an in-memory set or a corpus store view, see 'load_set'), the entries of its segments as (label number,
+#   reference) and a function that read the segment of a reference. Only the references
+#   are kept so a folder set isn't loaded into memory.
+def setEntries(source):
+    if isinstance(source, str):
+        target_names = sorted(label for label in os.listdir(source)
+                              if os.path.isdir(os.path.join(source, label)))
+        entries = [(i, os.path.join(source, label, file)) for i, label in enumerate(target_names)
+                   for file in sorted(os.listdir(os.path.join(source, label)))]
+
+        def read(file):
+            with open(file, 'r', encoding="utf8", errors="ignore") as segment:
+                return segment.read()
+
+        return target_names, entries, read
+
+    if isinstance(source, cs.SegmentView):
+        return (source.target_names, list(zip(source.target().tolist(), source.indices.tolist())),
+                source.store.text)
+
+    target_names = sorted(source)
+    entries = [(i, (label, j)) for i, label in enumerate(target_names)
+               for j in range(len(source[label]))]
+    return target_names, entries, lambda reference: source[reference[0]][reference[1]]
+
+
+# The function fit a pipe out-of-core for train sets that don't fit in memory. The segments
+#   are hashed instead of building a vocabulary and the linear classifier (SGD with hinge
+#   loss) is trained on shuffled minibatches of batch_size segments for epochs passes over
+#   the train set, so only a minibatch of the segments is in memory. A first pass count the
+#   document frequency of the hashed features for the idf. The pipe keep a sample of
+#   REPLAY_SIZE segments of each label for updating it (see 'updatePipe').
+#   NOTE: the train set can be a path or an in-memory set (see 'load_set').
+def onlineFitPipe(train_set_path, epochs=5, batch_size=1000):
+    print("\nListing the train set files.")
+    target_names, entries, read = setEntries(train_set_path)
+
+    # Set the pipe.
+    pipe = Pipeline([
+        ('vect', HashingVectorizer(n_features=HASH_FEATURES, ngram_range=(1, 2),
+                                   alternate_sign=False, norm=None)),
+        ('tfidf', TfidfTransformer()),
+        ('clf', SGDClassifier(loss='hinge', alpha=1e-4, random_state=42)),
+    ])
+    vectorizer, tfidf, classifier = [step for _, step in pipe.steps]
+
+    def minibatches(order):
+        for i in range(0, len(order), batch_size):
+            batch = [entries[j] for j in order[i:i + batch_size]]
+            yield vectorizer.transform([read(reference) for _, reference in batch]), \
+                  [label for label, _ in batch]
+
+    # Count the document frequency (the rows of the hashed matrix have unique features).
+    print("Counting the document frequency of the features.")
+    document_frequency = np.zeros(HASH_FEATURES)
+    with it.stage("document_frequency", documents=len(entries), features=HASH_FEATURES):
+        for features, _ in minibatches(np.arange(len(entries))):
+            document_frequency += np.bincount(features.indices, minlength=HASH_FEATURES)
+    tfidf.fit(sparse.csr_matrix((1, HASH_FEATURES)))
+    tfidf.idf_ = np.log((1 + len(entries)) / (1 + document_frequency)) + 1
+
+    # Train the classifier on the minibatches of each epoch.
+    random_state = np.random.RandomState(42)
+    classes = np.arange(len(target_names))
+    for epoch in range(epochs):
+        print(f"Fitting the pipe, epoch {epoch + 1}/{epochs}.")
+        with it.stage("train_epoch", epoch=epoch + 1, documents=len(entries), labels=len(classes)):
+            for features, target in minibatches(random_state.permutation(len(entries))):
+                classifier.partial_fit(tfidf.transform(features), target, classes=classes)
+
+    # Keep a sample of the segments of each label and the number of segments it is taken from.
+    labels = np.array([label for label, _ in entries])
+    pipe.replay_, pipe.replay_seen_ = {}, {}
+    for i, name in enumerate(target_names):
+        index = random_state.permutation(np.flatnonzero(labels == i))[:REPLAY_SIZE]
+        pipe.replay_[name] = [read(entries[j][1]) for j in index]
+        pipe.replay_seen_[name] = int(np.sum(labels == i))
+
+    pipe.target_names_ = target_names
+    return pipe
+
+
+# The function update a fitted online pipe (see 'onlineFitPipe') with the train set (in
+#   the form of defaultdict(list) where the keys are the label), without training on all
+#   the old segments again. The classifier keep its weights and is trained on shuffled
+#   minibatches of the new segments for epochs passes. So the old labels aren't forgotten,
+#   the new segments are mixed with the sample of the old segments the pipe keep, as many
+#   of each label as the new segments have on average for a label. The new segments are
+#   then added to the sample (reservoir sampling keep it uniform). New labels are added to
+#   the labels of the pipe (in their sorted place) and start with zero weights.
+#   The idf of the pipe isn't changed.
+def updatePipe(pipe, train_set, epochs=5, batch_size=1000):
+    vectorizer, tfidf, classifier = [step for _, step in pipe.steps]
+    if not (isinstance(vectorizer, HashingVectorizer) and hasattr(classifier, "partial_fit")):
+        print("Only pipes fitted with the online option can be updated.")
+        sys.exit(0)
+
+    data = [segment for label in sorted(train_set) for segment in train_set[label]]
+    labels = [label for label in sorted(train_set) for _ in train_set[label]]
+    if not data:
+        print("No new segments, the pipe is up to date.")
+        return pipe
+
+    # Take the old segments of each label from the sample of the pipe.
+    if not hasattr(pipe, "replay_"):
+        print("The pipe has no sample of the old segments, only the new segments are used.")
+        pipe.replay_, pipe.replay_seen_ = {}, {}
+    size = int(np.ceil(len(data) / len(set(labels))))
+    random_state = np.random.RandomState(42)
+    replay = [(label, pipe.replay_[label][i]) for label in sorted(pipe.replay_)
+              for i in random_state.permutation(len(pipe.replay_[label]))[:size]]
+    replay_data = [segment for _, segment in replay]
+    replay_labels = [label for label, _ in replay]
+
+    # Add the new labels. A pipe of two labels has a single row for the second label.
+    old_names = list(pipe.target_names_)
+    target_names = sorted(set(old_names) | set(labels))
+    if len(target_names) > len(old_names):
+        print(f"Adding {len(target_names) - len(old_names)} new labels.")
+        coef, intercept = classifier.coef_, classifier.intercept_
+        if len(old_names) == 2:
+            coef, intercept = np.vstack([-coef, coef]), np.concatenate([-intercept, intercept])
+
+        index = [target_names.index(name) for name in old_names]
+        classifier.coef_ = np.zeros((len(target_names), coef.shape[1]))
+        classifier.coef_[index] = coef
+        classifier.intercept_ = np.zeros(len(target_names))
+        classifier.intercept_[index] = intercept
+        classifier.classes_ = np.arange(len(target_names))
+
+    documents = data + replay_data
+    target = np.array([target_names.index(label) for label in labels + replay_labels])
+
+    # Train the classifier on the minibatches of each epoch.
+    for epoch in range(epochs):
+        print(f"Updating the pipe, epoch {epoch + 1}/{epochs}.")
+        order = random_state.permutation(len(documents))
+        with it.stage("train_epoch", epoch=epoch + 1, documents=len(documents), labels=len(target_names)):
+            for i in range(0, len(order), batch_size):
+                batch = order[i:i + batch_size]
+                features = tfidf.transform(vectorizer.transform([documents[j] for j in batch]))
+                classifier.partial_fit(features, target[batch], classes=classifier.classes_)
+
+    # Add the new segments to the sample of the pipe.
+    for label, segment in zip(labels, data):
+        sample = pipe.replay_.setdefault(label, [])
+        pipe.replay_seen_[label] = pipe.replay_seen_.get(label, 0) + 1
+        if len(sample) < REPLAY_SIZE:
+            sample.append(segment)
+        else:
+            i = random_state.randint(pipe.replay_seen_[label])
+            if i < REPLAY_SIZE:
+                sample[i] = segment
+
+    pipe.target_names_ = target_names
+    return pipe
+
+
+# Load a pipe using pickle, or from a model artifact folder (see 'model_artifact').
+#   NOTE: by default the file should be in the main folder named 'pipe.pickle'.
+def loadPipe(path="pipe.pickle"):
+    if os.path.isdir(path):
+        print("\nLoading the pipe from the artifact folder.")
+        return ma.loadArtifact(path)
+
+    try:
+        print("\nLoading the pipe from the pickle file.")
+        return pickle.load(open(path, "rb"))
+    except Exception as e:
+        print("file missing. Please put the file in the main folder or check the name is 'pipe.pickle'.")
+        sys.exit(0)
+
+
+# The function return the pipe and the parameters to search for the classification. The
+#   classification can be "LinearSVC" or "SVC". If select_k is given the search also check
+#   keeping only the select_k best terms against keeping all of them (see 'selectPipe'), and
+#   if hebrew_analyzer is True the vectorizer use the Hebrew tokenizer (see 'hebrewPipe').
+#   The SVC has cache_size MB of kernel cache.
+def searchSpace(classification, select_k=0, hebrew_analyzer=False, cache_size=200):
+    # Set the LinearSVC classification search.
+    if classification == "LinearSVC":
+        check_pipe = Pipeline([
+            ('vect', TfidfVectorizer(min_df=3, max_df=0.85)),
+            ('clf', LinearSVC()),
+        ])
+        param = {
+            'vect__ngram_range': [(1, 1), (1, 2)],
+            'vect__use_idf' : [True, False],
+            'clf__C' : [10, 100, 1000],
+            'clf__loss' : ['hinge', 'squared_hinge'],
+        }
+
+    # Set the SVC classification search.
+    elif classification == "SVC":
+        check_pipe = Pipeline([
+            ('vect', TfidfVectorizer(min_df=3, max_df=0.85)),
+            ('clf', SVC(cache_size=cache_size)),
+        ])
+        param = {
+            'vect__ngram_range': [(1, 1), (1, 2)],
+            'vect__use_idf' : [True, False],
+            'clf__C' : [10, 100],
+            'clf__kernel' : ['linear', 'poly', 'rbf', 'sigmoid'],
+        }
+
+    else:
+        print("Pipe option not avilable. Please consult the documentation for available methods.")
+        sys.exit(0)
+
+    check_pipe = hebrewPipe(check_pipe, hebrew_analyzer)
+    if select_k:
+        check_pipe = selectPipe(check_pipe, select_k)
+        param['tfidf__use_idf'] = param.pop('vect__use_idf')
+        param['select__k'] = [select_k, 'all']
+
+    return check_pipe, param
+
+
+# The function print all the results of a search (the 'cv_results_' of the search).
+def printResults(cv_results):
+    for i in range(len(cv_results['params'])):
+        print(f"{(1 + i):02d}) params: {cv_results['params'][i]}.")
+        line = f"    mean train: {cv_results['mean_train_score'][i]:.2f}, "
+        line += f"std train: {cv_results['std_train_score'][i]:.2f}, "
+        line += f"mean test: {cv_results['mean_test_score'][i]:.2f}, "
+        line += f"std test: {cv_results['std_test_score'][i]:.2f}, "
+        line += f"rank test: {cv_results['rank_test_score'][i]:02d}.\n"
+        print(line)
+
+
+# The function return the search results (the 'cv_results_' of the search) as a list of rows,
+#   one for each setting, with the extra fields added to every row.
+def resultRows(cv_results, **extra):
+    rows = []
+    for i, params in enumerate(cv_results['params']):
+        row = dict(extra)
+        row["params"] = {key: list(value) if isinstance(value, tuple) else value
+                         for key, value in params.items()}
+        for key, values in cv_results.items():
+            if key != 'params' and not key.startswith('param_'):
+                row[key] = values[i].item()
+        rows.append(row)
+
+    return rows
+
+
+# The function save the search results rows as json to path.
+def saveResults(rows, path="search_results.json"):
+    print(f"Saveing the search results as '{path}'.")
+    with open(path, "w", encoding="utf8") as file:
+        json.dump(rows, file, indent=1)
+
+
+# The function save the pipe as 'pipe.pickle'.
+def savePipe(pipe, path="pipe.pickle"):
+    print(f"Saveing the pipe as '{path}'.")
+    pickle.dump(pipe, open(path, "wb"))
+
+
+# The function search for the best setting pipe for the train set. The classification can be
+#   "LinearSVC" or "SVC". the function can print all the results if needed and can save the
+#   found pipe and the results of the search ('search_results.json').
+def searchFitPipe(train_set_path, classification="LinearSVC", show_results=False, save_pipe=False,
+                  save_results=False, select_k=0, hebrew_analyzer=False, cache_size=200):
+    check_pipe, param = searchSpace(classification, select_k, hebrew_analyzer, cache_size)
+
+    print("\nLoading the train set files.")
+    train_set = load_set(train_set_path, "Train")
+    fitTokenizer(check_pipe, train_set)
+
+    # Only the vectorizer parameters change the features, so the fitted vectorizers of the
+    #   search are cached in a temporary folder. Each vectorizer setting is fitted once per
+    #   fold and its matrices are reused by all the classifier settings.
+    cache_path = mkdtemp(prefix="pipe_cache_")
+    check_pipe.set_params(memory=cache_path)
+
+    # Run the Search.
+    print("Start serching best parameters for the pipe.")
+    grid_search = GridSearchCV(check_pipe, param, cv=5, error_score=0, n_jobs=-1,
+                               return_train_score=True, iid=False)
+    try:
+        with it.stage("search", documents=len(train_set.data)):
+            grid_search.fit(train_set.data, train_set.target)
+    finally:
+        rmtree(cache_path, ignore_errors=True)
+    print("Serching done")
+
+    # Print the Best result and the rest if show_results - True.
+    print(f"\nBest parameters for {classification} are: {grid_search.best_params_}\n")
+
+    if show_results:
+        print("The rest of the search results are:")
+        printResults(grid_search.cv_results_)
+
+    if save_results:
+        saveResults(resultRows(grid_search.cv_results_))
+
+    # The search already refitted the best setting on the full train set.
+    pipe = grid_search.best_estimator_
+    pipe.set_params(memory=None)
+    pipe.target_names_ = train_set.target_names
+    pipe = prunePipe(pipe)
+    if save_pipe:
+        savePipe(pipe)
+
+    return pipe
+
+
+# The function search for the best setting pipe for the train set with successive halving.
+#   All the settings of the search are checked on a small part of the train set, only the
+#   best 1/factor of them are kept and checked again on a factor times bigger part, until
+#   a single setting is left and only it is fitted on the full train set. The parts are
+#   taken evenly from all the labels. If feature_store is given the found pipe is fitted
+#   through the feature store. The rest of the arguments are as in 'searchFitPipe'.
+def halvingSearchFitPipe(train_set_path, classification="LinearSVC", show_results=False,
+                         save_pipe=False, save_results=False, feature_store="", factor=3,
+                         select_k=0, hebrew_analyzer=False, cache_size=200):
+    check_pipe, param = searchSpace(classification, select_k, hebrew_analyzer, cache_size)
+
+    print("\nLoading the train set files.")
+    train_set = load_set(train_set_path, "Train")
+    fitTokenizer(check_pipe, train_set)
+    target = train_set.target
+
+    # Order the segments so every prefix of the order take the same share of each label.
+    random_state = np.random.RandomState(42)
+    share = np.empty(len(target))
+    for label in np.unique(target):
+        index = np.flatnonzero(target == label)
+        share[index] = random_state.permutation(len(index)) / len(index)
+    order = np.argsort(share, kind="mergesort")
+
+    # The share of each label (for each segment) that hold 5 of its segments.
+    label_counts = np.bincount(target)
+    minimum_share = (np.minimum(5, label_counts) / label_counts)[target]
+
+    # The number of rounds until a single setting is left.
+    candidates = list(ParameterGrid(param))
+    rounds = int(np.ceil(np.log(len(candidates)) / np.log(factor)))
+
+    # Cache the fitted vectorizers of each round (see 'searchFitPipe').
+    cache_path = mkdtemp(prefix="pipe_cache_")
+    check_pipe.set_params(memory=cache_path)
+
+    print("Start serching best parameters for the pipe.")
+    rows = []
+    try:
+        for i in range(rounds):
+            # Each part is factor times bigger and the last is 1/factor of the train set. The
+            #   part take the same share of each label but at least 5 segments of each label
+            #   (or all of it if it is smaller) for the 5 folds.
+            ratio = 1 / factor ** (rounds - i)
+            part = order[share[order] < minimum_share[order].clip(min=ratio)]
+            size = len(part)
+            print(f"Round {i + 1}: checking {len(candidates)} settings on {size} segments.")
+
+            grid_search = GridSearchCV(check_pipe, [{k: [v] for k, v in c.items()} for c in candidates],
+                                       cv=5, error_score=0, n_jobs=-1, return_train_score=True,
+                                       iid=False, refit=False)
+            with it.stage("search_round", round=i + 1, settings=len(candidates), documents=size):
+                grid_search.fit([train_set.data[j] for j in part], target[part])
+
+            if show_results:
+                printResults(grid_search.cv_results_)
+            rows += resultRows(grid_search.cv_results_, round=i + 1, segments=size)
+
+            # Keep the best 1/factor of the settings.
+            keep = int(np.ceil(len(candidates) / factor))
+            best = np.argsort(-grid_search.cv_results_['mean_test_score'], kind="mergesort")[:keep]
+            candidates = [grid_search.cv_results_['params'][j] for j in best]
+    finally:
+        rmtree(cache_path, ignore_errors=True)
+    print("Serching done")
+
+    print(f"\nBest parameters for {classification} are: {candidates[0]}\n")
+
+    if save_results:
+        saveResults(rows)
+
+    # Fit the pipe with the best result on the full train set.
+    pipe = check_pipe.set_params(memory=None, **candidates[0])
+    if feature_store:
+        fs.fitPipe(feature_store, pipe, train_set)
+    else:
+        print("Fitting the pipe.")
+        fitSteps(pipe, train_set)
+
+    pipe.target_names_ = train_set.target_names
+    pipe = prunePipe(pipe)
+    if save_pipe:
+        savePipe(pipe)
+
+    return pipe
+
+
+# The function return the kernel matrix of the SVC kernel ("linear", "poly", "rbf" or
+#   "sigmoid", with the default degree and coef0 of SVC) between the rows and the columns
+#   from their linear Gram matrix (the dot products), the squared norms of the rows and of
+#   the columns and gamma.
+def gramKernel(kernel, gram, gamma, row_norms, column_norms):
+    if kernel == "linear":
+        return gram
+    elif kernel == "poly":
+        return (gamma * gram) ** 3
+    elif kernel == "rbf":
+        distances = row_norms[:, None] + column_norms[None, :] - 2 * gram
+        return np.exp(-gamma * np.maximum(distances, 0))
+    else: # kernel == "sigmoid":
+        return np.tanh(gamma * gram)
+
+
+# The function search for the best setting SVC pipe for the train set like 'searchFitPipe'
+#   ("SVC" classification) with precomputed kernels. For each vectorizer setting and fold the
+#   features and their linear Gram matrix are computed once and all the kernels are derived
+#   from it, so the settings of the SVC (the kernel and C) are fitted on a kernel matrix
+#   (kernel='precomputed') instead of computing the kernel again for each of them. The
+#   gamma of the kernels is 'scale' (like the found pipe). The found pipe is an SVC with its
+#   kernel and cache_size MB of kernel cache fitted on the full train set. The rest of the
+#   arguments are as in 'searchFitPipe'.
+def kernelSearchFitPipe(train_set_path, show_results=False, save_pipe=False, save_results=False,
+                        select_k=0, hebrew_analyzer=False, cache_size=200):
+    check_pipe, param = searchSpace("SVC", select_k, hebrew_analyzer, cache_size)
+    check_pipe.set_params(clf__gamma='scale')
+    features_param = {key: value for key, value in param.items() if not key.startswith('clf__')}
+    svc_param = {key: value for key, value in param.items() if key.startswith('clf__')}
+
+    print("\nLoading the train set files.")
+    train_set = load_set(train_set_path, "Train")
+    fitTokenizer(check_pipe, train_set)
+    target = train_set.target
+    folds = list(StratifiedKFold(5).split(np.zeros(len(target)), target))
+
+    print("Start serching best parameters for the pipe.")
+    params, train_scores, test_scores = [], [], []
+    for features_setting in ParameterGrid(features_param):
+        settings = list(ParameterGrid(svc_param))
+        params += [{**features_setting, **svc_setting} for svc_setting in settings]
+        train_scores.append(np.zeros((len(settings), len(folds))))
+        test_scores.append(np.zeros((len(settings), len(folds))))
+
+        for i, (train, test) in enumerate(folds):
+            # The features and the Gram matrix of the fold.
+            features = Pipeline(clone(check_pipe).set_params(**features_setting).steps[:-1])
+            with it.stage("vectorize", documents=len(train)):
+                train_features = features.fit_transform([train_set.data[j] for j in train], target[train])
+                test_features = features.transform([train_set.data[j] for j in test])
+
+            with it.stage("gram_matrix", documents=len(train)):
+                train_gram = (train_features @ train_features.T).toarray()
+                test_gram = (test_features @ train_features.T).toarray()
+                train_norms = np.asarray(train_features.multiply(train_features).sum(axis=1)).ravel()
+                test_norms = np.asarray(test_features.multiply(test_features).sum(axis=1)).ravel()
+                # The 'scale' gamma of SVC.
+                size = np.prod(train_features.shape)
+                variance = train_features.multiply(train_features).sum() / size - (train_features.sum() / size) ** 2
+                gamma = 1 / (train_features.shape[1] * variance) if variance else 1.
+
+            # Each kernel is computed once (and kept one at a time) for all the settings with it.
+            for kernel in param['clf__kernel']:
+                train_kernel = gramKernel(kernel, train_gram, gamma, train_norms, train_norms)
+                test_kernel = gramKernel(kernel, test_gram, gamma, test_norms, train_norms)
+
+                for j, svc_setting in enumerate(settings):
+                    if svc_setting['clf__kernel'] != kernel:
+                        continue
+
+                    classifier = clone(check_pipe.steps[-1][1]).set_params(
+                        kernel='precomputed', **{key[len('clf__'):]: value for key, value in svc_setting.items()
+                                                 if key != 'clf__kernel'})
+                    with it.stage("train", labels=len(train_set.target_names), kernel=kernel):
+                        classifier.fit(train_kernel, target[train])
+                        train_scores[-1][j, i] = classifier.score(train_kernel, target[train])
+                        test_scores[-1][j, i] = classifier.score(test_kernel, target[test])
+    print("Serching done")
+
+    train_scores, test_scores = np.concatenate(train_scores), np.concatenate(test_scores)
+    cv_results = {
+        'params': params,
+        'mean_train_score': train_scores.mean(axis=1), 'std_train_score': train_scores.std(axis=1),
+        'mean_test_score': test_scores.mean(axis=1), 'std_test_score': test_scores.std(axis=1),
+        'rank_test_score': rankdata(-test_scores.mean(axis=1), method='min').astype(int),
+    }
+    best = params[int(np.argmax(cv_results['mean_test_score']))]
+    print(f"\nBest parameters for SVC are: {best}\n")
+
+    if show_results:
+        print("The rest of the search results are:")
+        printResults(cv_results)
+
+    if save_results:
+        saveResults(resultRows(cv_results))
+
+    # Fit the pipe with the best result on the full train set.
+    pipe = check_pipe.set_params(**best)
+    print("Fitting the pipe.")
+    fitSteps(pipe, train_set)
+
+    pipe.target_names_ = train_set.target_names
+    pipe = prunePipe(pipe)
+    if save_pipe:
+        savePipe(pipe)
+
+    return pipe
+
+
+# the function take test set path and a pipe and run the pipe on the test set.
+#   If print_report True the function print the classification report of the test set.
+#   If feature_store is given the test matrix is reused from the feature store.
+#   The function return the accuracy.
+def runTest(test_set_path, pipe, print_report=False, feature_store=""):
+    # Load the test set.
+    print("\nLoading the test set files.")
+    test_set = load_set(test_set_path, "Test")
+
+    # Run the pipe on the test set.
+    start = time.perf_counter()
+    if feature_store:
+        predicted = fs.predict(feature_store, pipe, test_set)
+    else:
+        predicted = predictSteps(pipe, test_set)
+    accuracy = 100 * np.mean(predicted == test_set.target)
+    print(f"Test set accuracy: {accuracy:.2f}% (predicted in {time.perf_counter() - start:.1f} seconds)")
+
+    # Print the classification report
+    if print_report:
+        print(metrics.classification_report(test_set.target, predicted,
+                                            target_names=test_set.target_names))
+
+    return accuracy